@@ -0,0 +1,249 @@
+#/benchmarks/hot_paths.py
+"""
+Micro-benchmarks for the scoring, selection and persistence paths on synthetic periods.
+
+Usage (from the project root):
+
+    python -m benchmarks.hot_paths                      # compare against the stored baseline
+    python -m benchmarks.hot_paths --update-baseline    # record a new baseline
+    python -m benchmarks.hot_paths --sizes 100 1000     # only run some of the sizes
+
+Exits with status 1 if any path got measurably slower or uses measurably more memory than the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import pandas as pd
+from lxml import html
+
+from utils import finviz_utils
+from utils.data_utils import get_headlines, load_ticker_data, save_ticker_data
+from utils.finviz_utils import get_news
+from utils.trading_utils import calculate_average_score, execute_trade, get_best_tickers, get_worst_tickers
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Number of tickers in each synthetic period and the headline records per ticker.
+# The largest period holds 10,000 tickers x 100 records = 1M records.
+SIZES = {
+    100: 10,
+    1000: 100,
+    10000: 100,
+}
+# get_news/get_headlines scrape one ticker at a time, so they are timed on a sample of ticker pages
+NEWS_SAMPLE_TICKERS = 100
+# Number of trades execute_trades places per run (5 best + 5 worst)
+NUM_TRADES = 10
+REPEATS = 5
+
+# A path regresses if it is this much slower/heavier than the baseline...
+TIME_TOLERANCE = 0.30
+MEMORY_TOLERANCE = 0.10
+# ...and the difference is larger than this, so tiny timings don't fail on noise
+MIN_TIME_DIFFERENCE = 0.005  # In seconds
+MIN_MEMORY_DIFFERENCE = 64 * 1024  # In bytes
+
+SOURCES = ['Reuters', 'Bloomberg', 'Motley Fool', 'Zacks', 'InvestorPlace']
+
+TRADE_PERIOD = {
+    'headline_start_time': pd.Timestamp('2023-08-01 06:30', tz='US/Pacific'),
+    'headline_end_time': pd.Timestamp('2023-08-01 13:00', tz='US/Pacific'),
+    'trade_buy_time': pd.Timestamp('2023-08-01 13:00', tz='US/Pacific'),
+    'trade_sell_time': pd.Timestamp('2023-08-02 06:30', tz='US/Pacific'),
+}
+
+
+def make_tickers(num_tickers: int) -> List[str]:
+    return [f'T{i:05d}' for i in range(num_tickers)]
+
+
+def make_news_page(ticker: str, num_rows: int, rng: random.Random):
+    """
+    Builds a parsed Finviz quote page with a news table of num_rows headlines inside TRADE_PERIOD.
+    """
+    rows = []
+    minutes = sorted((rng.randrange(7 * 60, 12 * 60) for _ in range(num_rows)), reverse=True)
+    for i, minute in enumerate(minutes):
+        time_string = f'{(minute // 60 - 1) % 12 + 1:02d}:{minute % 60:02d}{"AM" if minute < 12 * 60 else "PM"}'
+        timestamp = f'Aug-01-23 {time_string}' if i == 0 else time_string
+        rows.append(
+            f'<tr><td>{timestamp}</td><td>'
+            f'<div class="news-link-left"><a href="https://example.com/{ticker}/{i}">{ticker} headline number {i}</a></div>'
+            f'<div class="news-link-right"><span>({rng.choice(SOURCES)})</span></div>'
+            f'</td></tr>'
+        )
+    return html.fromstring(f'<html><body><table id="news-table">{"".join(rows)}</table></body></html>')
+
+
+def make_ticker_data(num_tickers: int, records_per_ticker: int, rng: random.Random) -> dict:
+    """
+    Builds a scored period in the ticker_data format described in the README, with
+    num_tickers * records_per_ticker records in total.
+    """
+    ticker_data = {}
+    for n, ticker in enumerate(make_tickers(num_tickers)):
+        # Every 50th ticker has a single record, so selection has to skip some, and the next one
+        # makes up for it, so the period holds exactly num_tickers * records_per_ticker records
+        if n % 50 == 0:
+            num_records = 1
+        elif n % 50 == 1:
+            num_records = 2 * records_per_ticker - 1
+        else:
+            num_records = records_per_ticker
+        records = []
+        for i in range(num_records):
+            score = rng.choice([1.0, 0.0, -1.0])
+            records.append({
+                'headline': {
+                    'publish_time': f'2023-08-01 {rng.randrange(7, 12):02d}:{rng.randrange(60):02d}:00',
+                    'headline': f'{ticker} headline number {i}',
+                    'url': f'https://example.com/{ticker}/{i}',
+                },
+                'response': 'YES Synthetic response.' if score > 0 else 'NO Synthetic response.',
+                'model': 'gpt-3.5-turbo',
+                'score': score,
+            })
+        scores = [record['score'] for record in records]
+        ticker_data[ticker] = {
+            'records': records,
+            'average_score': float(calculate_average_score(scores)),
+            'total_score': float(sum(scores)),
+            'buy_time': TRADE_PERIOD['trade_buy_time'].strftime('%Y-%m-%d %H:%M'),
+            'sell_time': TRADE_PERIOD['trade_sell_time'].strftime('%Y-%m-%d %H:%M'),
+        }
+    return ticker_data
+
+
+def measure(function: Callable[[], None], setup: Callable[[], None] = None) -> Dict[str, float]:
+    """
+    Times a function (best of REPEATS) and records its peak traced allocation in a separate run.
+    """
+    timings = []
+    for _ in range(REPEATS):
+        if setup:
+            setup()
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+
+    # tracemalloc slows everything down, so memory is measured in its own run
+    if setup:
+        setup()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_size(num_tickers: int, records_per_ticker: int) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every benchmark on one synthetic period size.
+    """
+    rng = random.Random(num_tickers)
+    results = {}
+
+    sample = make_tickers(min(num_tickers, NEWS_SAMPLE_TICKERS))
+    pages = {ticker: make_news_page(ticker, records_per_ticker, rng) for ticker in sample}
+
+    def fill_pages():
+        finviz_utils.STOCK_PAGE.clear()
+        finviz_utils.STOCK_PAGE.update(pages)
+
+    results['get_news'] = measure(lambda: [get_news(ticker, TRADE_PERIOD) for ticker in sample], fill_pages)
+    results['get_headlines'] = measure(lambda: [get_headlines(ticker, TRADE_PERIOD) for ticker in sample], fill_pages)
+    finviz_utils.STOCK_PAGE.clear()
+
+    ticker_data = make_ticker_data(num_tickers, records_per_ticker, rng)
+    all_scores = [[record['score'] for record in data['records']] for data in ticker_data.values()]
+
+    results['save_ticker_data'] = measure(lambda: save_ticker_data(ticker_data, TRADE_PERIOD))
+    results['load_ticker_data'] = measure(lambda: load_ticker_data(TRADE_PERIOD))
+    results['calculate_average_score'] = measure(lambda: [calculate_average_score(scores) for scores in all_scores])
+    results['get_best_tickers'] = measure(lambda: get_best_tickers(ticker_data))
+    results['get_worst_tickers'] = measure(lambda: get_worst_tickers(ticker_data))
+
+    trades = [('short_sell', ticker, data) for ticker, data in get_worst_tickers(ticker_data, NUM_TRADES // 2)]
+    trades += [('buy', ticker, data) for ticker, data in get_best_tickers(ticker_data, NUM_TRADES // 2)]
+    datetime_string = TRADE_PERIOD['trade_buy_time'].strftime('%Y%m%d_%H%M')
+
+    def remove_orders():
+        for action in ('buy', 'short_sell'):
+            for suffix in ('_orders.csv', '_data.json'):
+                path = f'data/{datetime_string}/{action}{suffix}'
+                if os.path.exists(path):
+                    os.remove(path)
+
+    results['execute_trade'] = measure(
+        lambda: [execute_trade(action, ticker, data, TRADE_PERIOD) for action, ticker, data in trades], remove_orders
+    )
+    return results
+
+
+def find_regressions(results: dict, baseline: dict) -> List[str]:
+    """
+    Compares results against the baseline and describes every path that got slower or heavier.
+    """
+    regressions = []
+    for size, paths in results.items():
+        for path, result in paths.items():
+            base = baseline.get(size, {}).get(path)
+            if base is None:
+                continue
+            seconds_difference = result['seconds'] - base['seconds']
+            if seconds_difference > MIN_TIME_DIFFERENCE and result['seconds'] > base['seconds'] * (1 + TIME_TOLERANCE):
+                regressions.append(f"{path} @ {size} tickers: {base['seconds']:.4f}s -> {result['seconds']:.4f}s")
+            memory_difference = result['peak_bytes'] - base['peak_bytes']
+            if memory_difference > MIN_MEMORY_DIFFERENCE and result['peak_bytes'] > base['peak_bytes'] * (1 + MEMORY_TOLERANCE):
+                regressions.append(f"{path} @ {size} tickers: {base['peak_bytes'] / 1e6:.2f}MB -> {result['peak_bytes'] / 1e6:.2f}MB peak")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), choices=list(SIZES))
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_directory:
+        # save_ticker_data/execute_trade write to data/<period>, keep that out of the real data directory
+        os.chdir(tmp_directory)
+        try:
+            for size in args.sizes:
+                print(f'Running {size} tickers x up to {SIZES[size]} records')
+                results[str(size)] = run_size(size, SIZES[size])
+                for path, result in results[str(size)].items():
+                    print(f"  {path:<24} {result['seconds'] * 1000:10.2f}ms {result['peak_bytes'] / 1e6:10.2f}MB peak")
+        finally:
+            os.chdir(cwd)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as infile:
+            baseline = json.load(infile)
+
+    if args.update_baseline or not baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as outfile:
+            json.dump(baseline, outfile, indent=4)
+        print(f'Baseline written to {BASELINE_PATH}')
+        return 0
+
+    regressions = find_regressions(results, baseline)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,14 +10,93 @@ TRADING_ACCOUNT_PASSWORD = os.getenv("TRADING_ACCOUNT_PASSWORD")
 TRADING_ACCOUNT_API_KEY = os.getenv("TRADING_ACCOUNT_API_KEY")
 
 
-# List of S&P 500 tickers you're interested in
+# List of S&P 500 tickers you're interested in, used unless UNIVERSE_FILE is set (see utils/universe_utils.py)
 TICKERS =  [ 'TSLA', 'NVDA', 'JPM', 'JNJ', 'AAPL', 'MSFT', 'GOOGL', 'META', 'AMZN','V', 'HD', 'PG', 'UNH', 'DIS', 'MA', 
            'PYPL', 'BAC', 'INTC', 'VZ', 'XOM', 'KO', 'NKE', 'MCD', 'ADBE', 'IBM', 'CRM', 'CMCSA', 'CSCO', 'PEP', 
            'AMGN', 'ABBV', 'ACN', 'MDT', 'TXN', 'ABT', 'WMT', 'AVGO', 'TMO', 'QCOM', 'COST', 'NEE', 'LIN', 'HON', 
-           'DHR', 'PM', 'PG', 'UNP', 'LLY', 'MMM', 'LOW', 'SBUX', 'CVX', 'RTX', 'GS', 'INTU', 'UPS', 'SCHW', 'BA', 
+           'DHR', 'PM', 'UNP', 'LLY', 'MMM', 'LOW', 'SBUX', 'CVX', 'RTX', 'GS', 'INTU', 'UPS', 'SCHW', 'BA', 
            'BKNG', 'GILD', 'ISRG', 'CAT', 'SPGI', 'BLK', 'AMT', 'BMY', 'GE', 'AMD', 'LMT', 'MO', 'WBA', 'CVS', 
            'CI', 'PNC', 'MS', 'AXP', 'SYK', 'DUK', 'FIS', 'TJX', 'NOW', 'USB', 'C', 'SO', 'MU', 'CSX', 'T', 'PLD', 
-           'ZTS', 'CCI', 'DD', 'VRTX', 'FISV', 'ADP', 'CL', 'VRTX', 'NSC', 'D', 'EL', 'GD']
+           'ZTS', 'CCI', 'DD', 'VRTX', 'FISV', 'ADP', 'CL', 'NSC', 'D', 'EL', 'GD']
 
 
 
+
+# Sharded scan settings (see main.run_worker / main.run_coordinator)
+# A worker's claim on a ticker expires after this many seconds, so a crashed worker's tickers get picked up again
+WORKER_LEASE_SECONDS = 600
+# A ticker that is claimed this many times without finishing (errors or crashed workers) is marked failed
+MAX_TICKER_ATTEMPTS = 3
+# How often the coordinator checks whether the workers have drained the queue
+COORDINATOR_POLL_SECONDS = 10
+
+# Model cascade (see gpt_utils.get_cascade_response)
+# Every headline goes to the first tier; it is only re-asked to the next tier if the answer is uncertain.
+# Each tier has its own rate budget (max_calls per period seconds) and max number of concurrent requests.
+MODEL_TIERS = [
+    {"model": "gpt-3.5-turbo", "max_calls": 30, "period": 60, "max_concurrency": 4},
+    {"model": "gpt-4", "max_calls": 10, "period": 60, "max_concurrency": 2},
+]
+# Words in the explanation sentence that mark an answer as low-confidence and worth escalating.
+# Modal verbs like "may" or "could" are left out on purpose: they show up in most confident one-sentence explanations.
+HEDGE_WORDS = ["unclear", "uncertain", "ambiguous", "mixed", "depends", "neutral", "unpredictable"]
+
+# Semantic verdict cache (see utils/cache_utils.py)
+SEMANTIC_CACHE_PATH = "data/semantic_cache.json"
+# Cosine similarity above which a new headline reuses a past headline's verdict. The hashed n-gram vectors
+# measure wording, not meaning, so this is tuned to catch the same story lightly reworded by another outlet
+# ("Apple beats Q3 earnings estimates on strong iPhone sales" vs "Apple tops Q3 earnings estimates on strong
+# iPhone sales" scores 0.86), not real paraphrases (0.4-0.7). Headlines whose polarity words disagree
+# ("beat ... up" vs "miss ... down" still scores around 0.8) never match, see SEMANTIC_CACHE_POLARITY_WORDS.
+SEMANTIC_CACHE_THRESHOLD = 0.85
+# Size of the hashed n-gram vectors
+SEMANTIC_CACHE_DIMENSIONS = 2048
+# Entries older than this are evicted when the cache is rebuilt
+SEMANTIC_CACHE_MAX_AGE_DAYS = 30
+# Maximum number of entries kept per ticker, the oldest are evicted first
+SEMANTIC_CACHE_MAX_ENTRIES = 500
+# Words that give a headline its direction. A cached verdict is only reused if the new headline contains
+# the same directions (positive, negative, both or neither) as the cached one. Entries of four letters or
+# more also match as a prefix ("beat" matches "beats", "plung" matches "plunges"), shorter ones only whole.
+SEMANTIC_CACHE_POLARITY_WORDS = {
+    "positive": ["beat", "top", "tops", "rise", "rises", "rising", "rose", "up", "climb", "surg", "jump", "gain",
+                 "rais", "upgrad", "strong", "record", "soar", "rall", "boost", "win", "wins", "won", "approv",
+                 "exceed", "outperform", "buy"],
+    "negative": ["miss", "fall", "fell", "down", "drop", "plung", "slump", "cut", "cuts", "downgrad", "weak",
+                 "lawsuit", "loss", "declin", "sink", "sank", "slid", "lower", "probe", "recall", "fail",
+                 "underperform", "sell"],
+}
+
+# Strategy parameter sweep (see sweep.py). The live strategy is top_k=5, min_headlines=2, mean scores.
+SWEEP_GRID = {
+    "top_k": [1, 3, 5, 10, 20],
+    "min_headlines": [1, 2, 3, 5],
+    "score_methods": ["mean", "sum", "decayed"],
+    "half_life_hours": [2, 6, 24],
+    "excluded_sources": [[], ["Motley Fool"], ["Motley Fool", "InvestorPlace", "Zacks"]],
+}
+
+# Ticker universe (see utils/universe_utils.py)
+# File with one ticker per line (or a CSV whose first column is the ticker); TICKERS is used if unset
+UNIVERSE_FILE = os.getenv("UNIVERSE_FILE")
+UNIVERSE_STATS_PATH = "data/universe_stats.json"
+# Average headlines per period that put a ticker in the hot/warm tier, everything below is cold
+HOT_TIER_MIN_RATE = 3.0
+WARM_TIER_MIN_RATE = 0.5
+# Tickers observed in fewer periods than this are treated as hot, so every ticker's rate gets measured first
+MIN_TIER_PERIODS = 3
+# Hot tickers are fetched every period, warm and cold ones every Nth period
+WARM_FETCH_EVERY = 6
+COLD_FETCH_EVERY = 40
+# Weight of the latest period in the moving average of a ticker's headline rate
+ACTIVITY_SMOOTHING = 0.3
+
+# Anytime mode (see main.run_anytime): orders are placed this many seconds before trade_buy_time
+# with whatever has been scored by then
+DECISION_LEAD_SECONDS = 60
+# Number of headlines scored at the same time in anytime mode, each model tier still applies its own limits
+ANYTIME_MAX_WORKERS = 6
+# Number of tickers whose headlines are fetched at the same time in anytime mode
+ANYTIME_FETCH_WORKERS = 8
+# Share of the time before the deadline that anytime mode may spend fetching headlines, the rest is kept for scoring
+ANYTIME_FETCH_SHARE = 0.5
@@ -3,10 +3,15 @@ import logging
 
 import pandas as pd
 from utils.data_utils import get_headlines, preprocess_headlines, load_ticker_data, save_ticker_data
-from utils.gpt_utils import generate_prompt, get_gpt3_response, process_gpt3_response
-from utils.trading_utils import calculate_cumulative_score, execute_trade, calculate_average_score, get_trade_period, get_worst_tickers, get_best_tickers
-from config import TICKERS
+from utils.gpt_utils import generate_prompt, get_cascade_response, process_gpt3_response, report_cascade_stats
+from utils.trading_utils import calculate_cumulative_score, execute_trade, calculate_average_score, get_trade_period, get_worst_tickers, get_best_tickers, MIN_SELECTION_RECORDS
+from utils.cache_utils import lookup_verdict, add_verdict, save_semantic_cache, report_semantic_cache_stats
+from utils.shard_utils import init_work_queue, reset_work_queue, claim_ticker, extend_lease, complete_ticker, release_ticker, get_tickers, count_tickers, count_unfinished_tickers, save_shard_data, merge_shard_data
+from utils.universe_utils import get_scheduled_tickers, record_ticker_activity
+from config import WORKER_LEASE_SECONDS, MAX_TICKER_ATTEMPTS, COORDINATOR_POLL_SECONDS, DECISION_LEAD_SECONDS, ANYTIME_MAX_WORKERS, ANYTIME_FETCH_WORKERS, ANYTIME_FETCH_SHARE
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Optional
 import datetime
 
@@ -23,7 +28,7 @@ def get_and_process_headlines(ticker, trade_period):
 
     # Skip this loop if no headlines returned
     if not headlines:
-        return None
+        return []
 
     # Preprocess the headlines
     headlines = preprocess_headlines(headlines)
@@ -31,51 +36,64 @@ def get_and_process_headlines(ticker, trade_period):
     return headlines
 
 
-def generate_and_store_records(headlines, ticker, ticker_data):
-    records = []
-
+def get_processed_headlines(ticker, ticker_data):
     # Create a set of already processed headlines for this ticker
     processed_headlines = {}
     if ticker in ticker_data:
         processed_headlines = {record["headline"]["url"]: record for record in ticker_data[ticker].get('records', [])}
+    return processed_headlines
 
-    # Generate prompt and get GPT-3's response for each headline
-    for headline in headlines:
-        if headline['url'] in processed_headlines:
-            # If the headline is already processed, reuse its data
-            record = processed_headlines[headline['url']]
-        else:
-            prompt = generate_prompt(headline, ticker)
-            response = get_gpt3_response(prompt)
-            score = process_gpt3_response(response)
 
-            if prompt is None or response is None or score is None:
-                continue
+def generate_record(headline, ticker, processed_headlines):
+    if headline['url'] in processed_headlines:
+        # If the headline is already processed, reuse its data
+        return processed_headlines[headline['url']]
 
-            # Create a new record
-            record = {
-                "headline": headline,
-                "response": response,
-                "score": score
-            }
-        
-        # Append the record to the list
-        records.append(record)
-    
-    return records
+    if (cached := lookup_verdict(ticker, headline)) is not None:
+        # A reworded version of this headline was already scored, reuse its verdict
+        return {
+            "headline": headline,
+            "response": cached["response"],
+            "model": cached["model"],
+            "score": cached["score"],
+            "cached_from": cached["url"]
+        }
 
+    prompt = generate_prompt(headline, ticker)
+    response, model_name = get_cascade_response(prompt)
+    score = process_gpt3_response(response)
 
+    if prompt is None or response is None or score is None:
+        return None
 
+    add_verdict(ticker, headline, response, score, model_name)
+    # Create a new record
+    return {
+        "headline": headline,
+        "response": response,
+        "model": model_name,
+        "score": score
+    }
 
-def process_ticker(ticker, trade_period, ticker_data):
-    logging.info(f"Processing ticker {ticker}")
 
-    headlines = get_and_process_headlines(ticker, trade_period)
-    if not headlines:
-        return None
+def generate_and_store_records(headlines, ticker, ticker_data, on_headline=None):
+    records = []
+    processed_headlines = get_processed_headlines(ticker, ticker_data)
+
+    # Generate prompt and get GPT-3's response for each headline
+    for headline in headlines:
+        record = generate_record(headline, ticker, processed_headlines)
 
-    records = generate_and_store_records(headlines, ticker, ticker_data)
+        # Append the record to the list
+        if record is not None:
+            records.append(record)
+        if on_headline is not None:
+            on_headline()
+    
+    return records
 
+
+def build_ticker_info(ticker, records, trade_period, total_headlines):
     # Calculate average score for the day
     total_score = calculate_cumulative_score([record["score"] for record in records])
     average_score = calculate_average_score([record["score"] for record in records])
@@ -84,6 +102,7 @@ def process_ticker(ticker, trade_period, ticker_data):
     # Store all the relevant information for the ticker in the dictionary
     ticker_info = {
         "records": records,
+        "total_headlines": total_headlines,
         "average_score": average_score,
         "total_score": total_score,
         "buy_time": trade_period['trade_buy_time'].strftime('%Y-%m-%d %H:%M'),
@@ -93,6 +112,20 @@ def process_ticker(ticker, trade_period, ticker_data):
     return ticker_info
 
 
+def process_ticker(ticker, trade_period, ticker_data, on_headline=None):
+    logging.info(f"Processing ticker {ticker}")
+
+    headlines = get_and_process_headlines(ticker, trade_period)
+    if headlines is None:
+        # Not the same as a ticker without headlines, the activity stats must not count it as quiet
+        raise RuntimeError(f"Could not get headlines for {ticker}")
+    if not headlines:
+        return None
+
+    records = generate_and_store_records(headlines, ticker, ticker_data, on_headline)
+    return build_ticker_info(ticker, records, trade_period, len(headlines))
+
+
 def delete_old_files(directory):
     file_list = [f'{directory}/buy_orders.csv', f'{directory}/short_sell_orders.csv']
     for filepath in file_list:
@@ -117,10 +150,7 @@ def execute_trades(ticker_data, trade_period):
         logging.info(f"Executing buy trade for {ticker} with average score {data['average_score']}, total score {data['total_score']}, buy time {data['buy_time']}, and sell time {data['sell_time']}")
         execute_trade('buy', ticker, data, trade_period)
 
-def main(date_string: Optional[str] = None):
-    logging.basicConfig(filename='logs/trading_bot.log', level=logging.INFO)
-    logging.info("Starting trading bot")
-
+def get_trade_period_for(date_string: Optional[str] = None):
     if date_string:
         date_time = pd.Timestamp(datetime.datetime.strptime(date_string, "%Y-%m-%d %H:%M"), tz='US/Pacific')
     else:
@@ -130,25 +160,253 @@ def main(date_string: Optional[str] = None):
     print(date_time)
     print(trade_period)
     logging.info(trade_period)
+    return trade_period
+
+
+def main(date_string: Optional[str] = None):
+    logging.basicConfig(filename='logs/trading_bot.log', level=logging.INFO)
+    logging.info("Starting trading bot")
+
+    trade_period = get_trade_period_for(date_string)
     datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
     directory = f'data/{datetime_string}'
 
     delete_old_files(directory)
 
     ticker_data = load_ticker_data(trade_period)
-
-    for ticker in TICKERS:
-        ticker_info = process_ticker(ticker, trade_period, ticker_data)
+    tickers = get_scheduled_tickers(trade_period)
+    logging.info(f"Scheduled {len(tickers)} tickers for this period")
+
+    fetched_tickers = []
+    for ticker in tickers:
+        try:
+            ticker_info = process_ticker(ticker, trade_period, ticker_data)
+        except Exception as e:
+            logging.info(f"Error processing {ticker}: {e}, continuing.")
+            continue
+        fetched_tickers.append(ticker)
         if ticker_info:
             ticker_data[ticker] = ticker_info
             save_ticker_data(ticker_data, trade_period)
 
     logging.info("Finished processing all tickers")
+    record_ticker_activity(fetched_tickers, ticker_data, trade_period)
+    save_semantic_cache()
+    report_cascade_stats()
+    report_semantic_cache_stats()
     execute_trades(ticker_data, trade_period)
 
 
-if __name__ == "__main__":
-    date_string = sys.argv[1] if len(sys.argv) > 1 else None
-    main(date_string)
+def run_worker(worker_id: str, date_string: Optional[str] = None):
+    """
+    Claims tickers from the shared work queue until it is empty, writing results to this worker's shard.
+    Run as many workers as you have API keys/hosts; each one only needs OPENAI_API_KEY set in its environment.
+    """
+    logging.basicConfig(filename=f'logs/trading_bot_{worker_id}.log', level=logging.INFO)
+    logging.info(f"Starting worker {worker_id}")
+
+    trade_period = get_trade_period_for(date_string)
+    init_work_queue(trade_period, get_scheduled_tickers(trade_period))
+
+    # Previously merged results let the worker reuse already scored headlines
+    ticker_data = load_ticker_data(trade_period)
+    shard_data = {}
+
+    while True:
+        ticker = claim_ticker(trade_period, worker_id, WORKER_LEASE_SECONDS, MAX_TICKER_ATTEMPTS)
+        if ticker is None:
+            break
+        # Renew the claim after every headline, a busy ticker can take longer than one lease to score
+        def renew_lease():
+            if not extend_lease(trade_period, ticker, worker_id, WORKER_LEASE_SECONDS):
+                logging.info(f"Could not renew the lease on {ticker}, another worker owns it now")
+
+        try:
+            ticker_info = process_ticker(ticker, trade_period, ticker_data, renew_lease)
+        except Exception as e:
+            logging.info(f"Error processing {ticker}: {e}, releasing it")
+            release_ticker(trade_period, ticker, worker_id, MAX_TICKER_ATTEMPTS)
+            continue
+        if ticker_info:
+            shard_data[ticker] = ticker_info
+            save_shard_data(shard_data, trade_period, worker_id)
+        if not complete_ticker(trade_period, ticker, worker_id):
+            logging.info(f"Lease on {ticker} expired before it was finished, another worker owns it now")
+
+    logging.info(f"Worker {worker_id} finished, processed {len(shard_data)} tickers")
+    save_semantic_cache()
+    report_cascade_stats()
+    report_semantic_cache_stats()
+
+
+def run_coordinator(date_string: Optional[str] = None):
+    """
+    Queues the tickers, waits for the workers to drain the queue (or the decision deadline), then merges the shards and trades once.
+    Start the coordinator before the workers, it resets the queue left over from earlier runs of the period.
+    """
+    logging.basicConfig(filename='logs/trading_bot.log', level=logging.INFO)
+    logging.info("Starting coordinator")
+
+    trade_period = get_trade_period_for(date_string)
+    datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
+    directory = f'data/{datetime_string}'
+
+    delete_old_files(directory)
+    tickers = get_scheduled_tickers(trade_period)
+    reset_work_queue(trade_period, tickers)
+
+    # Trade on whatever the workers finished if they haven't drained the queue by the decision deadline.
+    # A period whose deadline has already passed (a backtest of a past date) waits for the whole queue instead.
+    deadline = trade_period['trade_buy_time'] - pd.Timedelta(seconds=DECISION_LEAD_SECONDS)
+    if deadline <= pd.Timestamp.now(tz='US/Pacific'):
+        logging.info("Decision deadline has already passed, waiting for the queue to drain")
+        deadline = None
+    while True:
+        remaining = count_unfinished_tickers(trade_period)
+        if remaining == 0:
+            break
+        if deadline is not None and pd.Timestamp.now(tz='US/Pacific') >= deadline:
+            logging.info(f"Deadline reached with {remaining} tickers unfinished, trading without them")
+            break
+        logging.info(f"Waiting for workers, {remaining} tickers left")
+        time.sleep(COORDINATOR_POLL_SECONDS)
+
+    failed = count_tickers(trade_period, ['failed'])
+    if failed:
+        logging.info(f"{failed} tickers failed after {MAX_TICKER_ATTEMPTS} attempts")
+
+    ticker_data = load_ticker_data(trade_period)
+    ticker_data.update(merge_shard_data(trade_period))
+    save_ticker_data(ticker_data, trade_period)
+    # Failed and unfinished tickers weren't observed this period, only finished ones count towards the activity stats
+    record_ticker_activity(get_tickers(trade_period, ['done']), ticker_data, trade_period)
+
+    logging.info("Finished merging all shards")
+    execute_trades(ticker_data, trade_period)
+
+
+def get_fetched_headlines(tickers, trade_period, deadline):
+    # Fetch headlines concurrently for as many tickers as the deadline allows
+    executor = ThreadPoolExecutor(max_workers=ANYTIME_FETCH_WORKERS)
+    futures = {executor.submit(get_and_process_headlines, ticker, trade_period): ticker for ticker in tickers}
+    remaining = max((deadline - pd.Timestamp.now(tz='US/Pacific')).total_seconds(), 0)
+    done, pending = wait(futures, timeout=remaining)
+    # A hung request can't hold up the decision, whatever hasn't finished is dropped
+    executor.shutdown(wait=False, cancel_futures=True)
+    if pending:
+        logging.info(f"Fetch deadline reached, {len(pending)} tickers skipped")
+
+    # get_and_process_headlines catches its own errors and returns None for a failed fetch, those tickers are left out
+    fetched = {futures[future]: future.result() for future in futures if future in done}
+    failed = [ticker for ticker, headlines in fetched.items() if headlines is None]
+    if failed:
+        logging.info(f"Could not get headlines for {len(failed)} tickers, skipping them")
+    return {ticker: headlines for ticker, headlines in fetched.items() if headlines is not None}
+
+
+def get_prioritized_work(fetched):
+    """
+    Orders the (ticker, headline) pairs so that any prefix of the work is as informative as possible:
+    tickers with the most and freshest headlines come first, and each of them gets its MIN_SELECTION_RECORDS
+    freshest headlines scored before the next ticker starts, so a deadline early on still leaves tickers to trade.
+    The remaining headlines follow breadth-first, and tickers with too few headlines to be selected come last.
+    """
+    fetched = {
+        ticker: sorted(headlines, key=lambda headline: headline['publish_time'], reverse=True)
+        for ticker, headlines in fetched.items() if headlines
+    }
+    ticker_order = sorted(fetched, key=lambda ticker: (-len(fetched[ticker]), -fetched[ticker][0]['publish_time'].timestamp()))
+    selectable = [ticker for ticker in ticker_order if len(fetched[ticker]) >= MIN_SELECTION_RECORDS]
+
+    work = [(ticker, headline) for ticker in selectable for headline in fetched[ticker][:MIN_SELECTION_RECORDS]]
+    for rank in range(MIN_SELECTION_RECORDS, max((len(headlines) for headlines in fetched.values()), default=0)):
+        work.extend((ticker, fetched[ticker][rank]) for ticker in selectable if rank < len(fetched[ticker]))
+    work.extend((ticker, headline) for ticker in ticker_order if len(fetched[ticker]) < MIN_SELECTION_RECORDS
+                for headline in fetched[ticker])
+    return work
+
+
+def run_anytime(date_string: Optional[str] = None, time_budget: Optional[float] = None):
+    """
+    Scores headlines in priority order until the deadline, then trades on whatever has been scored.
+    The deadline is DECISION_LEAD_SECONDS before trade_buy_time, or time_budget seconds from now if given.
+    """
+    logging.basicConfig(filename='logs/trading_bot.log', level=logging.INFO)
+    logging.info("Starting trading bot in anytime mode")
+
+    trade_period = get_trade_period_for(date_string)
+    if time_budget is not None:
+        deadline = pd.Timestamp.now(tz='US/Pacific') + pd.Timedelta(seconds=time_budget)
+    else:
+        deadline = trade_period['trade_buy_time'] - pd.Timedelta(seconds=DECISION_LEAD_SECONDS)
+    logging.info(f"Decision deadline: {deadline}")
+    datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
+    directory = f'data/{datetime_string}'
+
+    delete_old_files(directory)
+
+    ticker_data = load_ticker_data(trade_period)
+    tickers = get_scheduled_tickers(trade_period)
+    # Fetching gets at most its share of the budget, so a slow Finviz can't leave no time to score
+    now = pd.Timestamp.now(tz='US/Pacific')
+    fetch_deadline = now + max(deadline - now, pd.Timedelta(0)) * ANYTIME_FETCH_SHARE
+    fetched = get_fetched_headlines(tickers, trade_period, fetch_deadline)
+    work = get_prioritized_work(fetched)
+    logging.info(f"Fetched {len(work)} headlines for {len(fetched)} tickers")
+    processed_headlines = {ticker: get_processed_headlines(ticker, ticker_data) for ticker in fetched}
+    records = {ticker: [] for ticker in fetched}
+
+    executor = ThreadPoolExecutor(max_workers=ANYTIME_MAX_WORKERS)
+    futures = {
+        executor.submit(generate_record, headline, ticker, processed_headlines[ticker]): ticker
+        for ticker, headline in work
+    }
+    pending = set(futures)
+    while pending:
+        remaining = (deadline - pd.Timestamp.now(tz='US/Pacific')).total_seconds()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            ticker = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # One failing headline must not stop the run from trading on time
+                logging.info(f"Error scoring a headline for {ticker}: {e}, continuing")
+                continue
+            if record is not None:
+                # Keep the ticker's scores current so the rankings are ready whenever the deadline hits
+                records[ticker].append(record)
+                ticker_data[ticker] = build_ticker_info(ticker, records[ticker], trade_period, len(fetched[ticker]))
+
+    # Drop the work that hasn't started, in-flight requests finish in the background and are ignored
+    executor.shutdown(wait=False, cancel_futures=True)
+    logging.info(f"Scored {len(work) - len(pending)} of {len(work)} headlines before the deadline")
 
+    for ticker, headlines in fetched.items():
+        if records[ticker]:
+            ticker_data[ticker]["coverage"] = len(records[ticker]) / len(headlines)
+            logging.info(f"Coverage for {ticker}: {len(records[ticker])}/{len(headlines)} headlines")
+    save_ticker_data(ticker_data, trade_period)
 
+    execute_trades(ticker_data, trade_period)
+    # Tickers with headlines but nothing scored have no ticker_data entry to measure, leave their rate as it is
+    record_ticker_activity([ticker for ticker in fetched if not fetched[ticker] or records[ticker]], ticker_data, trade_period)
+    save_semantic_cache()
+    report_cascade_stats()
+    report_semantic_cache_stats()
+
+
+if __name__ == "__main__":
+    # Usage: main.py [date] | main.py [date] worker <worker_id> | main.py [date] coordinator | main.py [date] anytime [seconds]
+    date_string = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] else None
+    mode = sys.argv[2] if len(sys.argv) > 2 else None
+    if mode == 'worker':
+        run_worker(sys.argv[3], date_string)
+    elif mode == 'coordinator':
+        run_coordinator(date_string)
+    elif mode == 'anytime':
+        run_anytime(date_string, float(sys.argv[3]) if len(sys.argv) > 3 else None)
+    else:
+        main(date_string)
@@ -0,0 +1,46 @@
+import argparse
+import csv
+import json
+import time
+
+from utils.sweep_utils import load_scored_periods, load_prices, get_ticker_returns, run_sweep
+from config import SWEEP_GRID
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluates a grid of selection parameters on already scored periods, without calling the LLM.")
+    parser.add_argument('--data', default='data', help='directory with the scored periods')
+    parser.add_argument('--prices', help="CSV file with 'ticker', 'time' and 'price' columns, to compute returns")
+    parser.add_argument('--output', default='data/sweep', help='prefix of the output files')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    scored = load_scored_periods(args.data)
+    returns = get_ticker_returns(scored, load_prices(args.prices)) if args.prices else None
+    print(f"Loaded {len(scored['score'])} records for {len(scored['tickers'])} tickers in {len(scored['periods'])} periods")
+
+    results = run_sweep(scored, SWEEP_GRID, returns)
+    print(f"Evaluated {len(results)} configurations in {time.time() - start_time:.2f}s")
+
+    with open(f'{args.output}_decisions.json', 'w') as outfile:
+        json.dump(results, outfile, indent=4)
+
+    fieldnames = ['top_k', 'min_headlines', 'score_method', 'half_life_hours', 'excluded_sources', 'num_positions', 'average_return']
+    with open(f'{args.output}_summary.csv', 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for result in results:
+            writer.writerow(dict(result, excluded_sources='|'.join(result['excluded_sources'])))
+
+    if returns is not None:
+        ranked = sorted((result for result in results if result['average_return'] is not None),
+                        key=lambda result: result['average_return'], reverse=True)
+        for result in ranked[:10]:
+            print(f"{result['average_return']:+.4%} over {result['num_positions']} positions: top_k={result['top_k']}, "
+                  f"min_headlines={result['min_headlines']}, {result['score_method']}"
+                  f"{'' if result['half_life_hours'] is None else ' ' + str(result['half_life_hours']) + 'h'}, "
+                  f"excluded={result['excluded_sources']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import datetime
+import json
+import multiprocessing
+
+import pytest
+
+import utils.cache_utils as cache_utils
+from utils.cache_utils import add_verdict, lookup_verdict, save_semantic_cache, load_semantic_cache, get_polarity
+
+HEADLINE = "Apple beats Q3 earnings estimates on strong iPhone sales"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_utils, "SEMANTIC_CACHE_PATH", str(tmp_path / "semantic_cache.json"))
+    monkeypatch.setattr(cache_utils, "SEMANTIC_CACHE", {})
+    monkeypatch.setattr(cache_utils, "SEMANTIC_CACHE_LOADED", False)
+
+
+def make_headline(text, url="query", hour=9):
+    return {"headline": text, "url": url, "publish_time": datetime.datetime(2023, 8, 1, hour, 30)}
+
+
+def test_reworded_headline_reuses_verdict():
+    add_verdict("AAPL", make_headline(HEADLINE, "u1"), "YES Good.", 1.0)
+    match = lookup_verdict("AAPL", make_headline("Apple tops Q3 earnings estimates on strong iPhone sales"))
+    assert match is not None and match["url"] == "u1"
+
+
+def test_unrelated_headline_and_other_ticker_miss():
+    add_verdict("AAPL", make_headline(HEADLINE, "u1"), "YES Good.", 1.0)
+    assert lookup_verdict("AAPL", make_headline("Apple faces EU antitrust probe over App Store")) is None
+    assert lookup_verdict("MSFT", make_headline(HEADLINE)) is None
+
+
+def test_opposite_polarity_never_matches():
+    positive = "Acme Q2 earnings and revenues beat estimates, shares up in premarket trading"
+    negative = "Acme Q2 earnings and revenues miss estimates, shares down in premarket trading"
+    assert get_polarity(positive) == "+"
+    assert get_polarity(negative) == "-"
+
+    add_verdict("ACME", make_headline(positive, "u1"), "YES Good.", 1.0)
+    assert lookup_verdict("ACME", make_headline(negative)) is None
+    assert lookup_verdict("ACME", make_headline(positive.replace("Q2", "second quarter"))) is not None
+
+
+def test_polarity_short_words_match_whole_words_only():
+    assert get_polarity("Company posts update on upcoming topic") == ""
+    assert get_polarity("Shares up after company tops estimates") == "+"
+
+
+def test_later_headlines_are_not_reused():
+    add_verdict("AAPL", make_headline(HEADLINE, "u1", hour=10), "YES Good.", 1.0)
+    assert lookup_verdict("AAPL", make_headline(HEADLINE, hour=9)) is None
+    assert lookup_verdict("AAPL", make_headline(HEADLINE, hour=10)) is not None
+
+
+def test_saved_cache_loads_without_embedding_again(monkeypatch):
+    add_verdict("AAPL", make_headline(HEADLINE, "u1"), "YES Good.", 1.0)
+    save_semantic_cache()
+    vectors = cache_utils.SEMANTIC_CACHE["AAPL"]["vectors"].copy()
+
+    cache_utils.SEMANTIC_CACHE.clear()
+    embed_headline = cache_utils.embed_headline
+    monkeypatch.setattr(cache_utils, "embed_headline", lambda text: pytest.fail("stored headline embedded again"))
+    load_semantic_cache()
+    assert (cache_utils.SEMANTIC_CACHE["AAPL"]["vectors"] == vectors).all()
+
+    # Saving again only embeds what was added since
+    monkeypatch.setattr(cache_utils, "embed_headline", embed_headline)
+    add_verdict("AAPL", make_headline(f"{HEADLINE} again", "u2"), "YES Good.", 1.0)
+    monkeypatch.setattr(cache_utils, "embed_headline", lambda text: pytest.fail("cached headline embedded again"))
+    save_semantic_cache()
+    assert len(cache_utils.SEMANTIC_CACHE["AAPL"]["entries"]) == 2
+
+
+def save_from_process(path, url):
+    cache_utils.SEMANTIC_CACHE_PATH = path
+    add_verdict("AAPL", make_headline(f"{HEADLINE} {url}", url), "YES Good.", 1.0)
+    save_semantic_cache()
+
+
+def test_concurrent_saves_keep_every_entry(tmp_path):
+    path = str(tmp_path / "shared_cache.json")
+    processes = [multiprocessing.Process(target=save_from_process, args=(path, f"u{i}")) for i in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with open(path) as infile:
+        entries = json.load(infile)
+    assert sorted(entry["url"] for entry in entries["AAPL"]) == sorted(f"u{i}" for i in range(8))
@@ -0,0 +1,69 @@
+import pytest
+
+import utils.gpt_utils as gpt_utils
+from utils.gpt_utils import get_cascade_response, is_uncertain_response, process_gpt3_response
+from config import MODEL_TIERS
+
+CHEAP, STRONG = (tier["model"] for tier in MODEL_TIERS)
+CONFIDENT = "YES Record iPhone sales should lift the stock."
+HEDGED = "YES The impact is unclear, but likely positive."
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    # One canned response per model, None for a failed request
+    responses = {}
+    monkeypatch.setattr(gpt_utils, "TIER_STATE", {})
+    monkeypatch.setattr(gpt_utils, "TIER_STATS", {})
+    monkeypatch.setattr(gpt_utils, "get_gpt3_response", lambda prompt, model_name=None: responses[model_name])
+    return responses
+
+
+def get_counts(model_name):
+    stats = gpt_utils.TIER_STATS.get(model_name, {})
+    return {key: stats.get(key, 0) for key in ("headlines", "failures", "escalations")}
+
+
+def test_confident_answers_are_not_escalated():
+    assert not is_uncertain_response("YES This could boost investor confidence in the company.")
+    assert not is_uncertain_response("NO The lawsuit may weigh on the stock in the near term.")
+
+
+def test_uncertain_answers_are_escalated():
+    assert is_uncertain_response("UNKNOWN The headline gives no clear direction.")
+    assert is_uncertain_response("YES The impact is unclear, but likely positive.")
+    assert is_uncertain_response(None)
+
+
+def test_unparseable_answers_are_escalated():
+    response = "Probably good for the stock."
+    assert process_gpt3_response(response) == 0.0
+    assert is_uncertain_response(response)
+
+
+def test_confident_answer_stays_on_the_first_tier(cascade):
+    cascade.update({CHEAP: CONFIDENT, STRONG: HEDGED})
+    assert get_cascade_response([]) == (CONFIDENT, CHEAP)
+    assert get_counts(CHEAP) == {"headlines": 1, "failures": 0, "escalations": 0}
+    assert get_counts(STRONG) == {"headlines": 0, "failures": 0, "escalations": 0}
+
+
+def test_hedged_answer_is_escalated(cascade):
+    cascade.update({CHEAP: HEDGED, STRONG: CONFIDENT})
+    assert get_cascade_response([]) == (CONFIDENT, STRONG)
+    assert get_counts(CHEAP) == {"headlines": 1, "failures": 0, "escalations": 1}
+    assert get_counts(STRONG) == {"headlines": 1, "failures": 0, "escalations": 0}
+
+
+def test_failed_later_tier_keeps_the_earlier_answer(cascade):
+    cascade.update({CHEAP: HEDGED, STRONG: None})
+    assert get_cascade_response([]) == (HEDGED, CHEAP)
+    assert get_counts(CHEAP) == {"headlines": 1, "failures": 0, "escalations": 1}
+    assert get_counts(STRONG) == {"headlines": 1, "failures": 1, "escalations": 0}
+
+
+def test_failed_first_tier_is_escalated(cascade):
+    cascade.update({CHEAP: None, STRONG: CONFIDENT})
+    assert get_cascade_response([]) == (CONFIDENT, STRONG)
+    assert get_counts(CHEAP) == {"headlines": 1, "failures": 1, "escalations": 1}
+    assert get_counts(STRONG) == {"headlines": 1, "failures": 0, "escalations": 0}
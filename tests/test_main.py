@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import main
+from utils.trading_utils import get_best_tickers
+from utils.shard_utils import claim_ticker, count_tickers
+
+
+def make_headline(ticker, i):
+    return {
+        'headline': f'{ticker} headline number {i}',
+        'url': f'https://example.com/{ticker}/{i}',
+        'publish_time': pd.Timestamp(f'2023-08-01 08:{i:02d}', tz='US/Pacific'),
+        'source': 'Reuters',
+    }
+
+
+TRADE_PERIOD = {
+    'headline_start_time': pd.Timestamp('2023-08-01 06:30', tz='US/Pacific'),
+    'headline_end_time': pd.Timestamp('2023-08-01 13:00', tz='US/Pacific'),
+    'trade_buy_time': pd.Timestamp('2023-08-01 13:00', tz='US/Pacific'),
+    'trade_sell_time': pd.Timestamp('2023-08-02 06:30', tz='US/Pacific'),
+}
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'logs').mkdir()
+    # get_trade_period needs the market calendar, the tests use a fixed past period
+    monkeypatch.setattr(main, 'get_trade_period_for', lambda date_string=None: TRADE_PERIOD)
+    monkeypatch.setattr(main, 'save_semantic_cache', lambda: None)
+
+
+@pytest.fixture
+def anytime(monkeypatch):
+    # DDD's fetch fails
+    fetched = {'AAA': [make_headline('AAA', i) for i in range(3)], 'BBB': [make_headline('BBB', 0)], 'CCC': [], 'DDD': None}
+    calls = {}
+
+    def generate_record(headline, ticker, processed_headlines):
+        if headline['url'].endswith('AAA/1'):
+            raise RuntimeError('model unavailable')
+        return {'headline': headline, 'response': 'YES', 'model': 'gpt-3.5-turbo', 'score': 1.0}
+
+    monkeypatch.setattr(main, 'get_scheduled_tickers', lambda trade_period: list(fetched))
+    monkeypatch.setattr(main, 'get_and_process_headlines', lambda ticker, trade_period: fetched[ticker])
+    monkeypatch.setattr(main, 'generate_record', generate_record)
+    monkeypatch.setattr(main, 'execute_trades', lambda ticker_data, trade_period: calls.update(trades=ticker_data))
+    monkeypatch.setattr(main, 'record_ticker_activity',
+                        lambda tickers, ticker_data, trade_period: calls.update(activity=(tickers, ticker_data)))
+    return calls
+
+
+def test_anytime_trades_when_a_headline_fails(anytime):
+    main.run_anytime(time_budget=30)
+
+    ticker_data = anytime['trades']
+    assert len(ticker_data['AAA']['records']) == 2
+    assert ticker_data['AAA']['total_headlines'] == 3
+    assert ticker_data['AAA']['coverage'] == pytest.approx(2 / 3)
+    assert len(ticker_data['BBB']['records']) == 1
+
+
+def test_anytime_records_activity_like_the_other_modes(anytime):
+    main.run_anytime(time_budget=30)
+
+    tickers, ticker_data = anytime['activity']
+    assert sorted(tickers) == ['AAA', 'BBB', 'CCC']
+    assert {ticker: ticker_data[ticker]['total_headlines'] for ticker in ticker_data} == {'AAA': 3, 'BBB': 1}
+
+
+@pytest.fixture
+def slow_scoring(monkeypatch):
+    # 4 tickers with 3 headlines each, the model stops answering after the first 4 headlines
+    fetched = {ticker: [make_headline(ticker, i) for i in range(3)] for ticker in ('AAA', 'BBB', 'CCC', 'DDD')}
+    release = threading.Event()
+    scored = []
+    calls = {}
+
+    def generate_record(headline, ticker, processed_headlines):
+        if len(scored) >= 4:
+            release.wait(5)
+            return None
+        scored.append(headline)
+        return {'headline': headline, 'response': 'YES', 'model': 'gpt-3.5-turbo', 'score': 1.0}
+
+    monkeypatch.setattr(main, 'ANYTIME_MAX_WORKERS', 1)
+    monkeypatch.setattr(main, 'get_scheduled_tickers', lambda trade_period: list(fetched))
+    monkeypatch.setattr(main, 'get_and_process_headlines', lambda ticker, trade_period: fetched[ticker])
+    monkeypatch.setattr(main, 'generate_record', generate_record)
+    monkeypatch.setattr(main, 'execute_trades', lambda ticker_data, trade_period: calls.update(trades=ticker_data))
+    monkeypatch.setattr(main, 'record_ticker_activity', lambda tickers, ticker_data, trade_period: None)
+    yield fetched, calls
+    release.set()
+
+
+def test_deadline_in_the_first_round_still_trades(slow_scoring):
+    fetched, calls = slow_scoring
+    main.run_anytime(time_budget=1)
+
+    assert len(get_best_tickers(calls['trades'])) == 2
+
+
+def test_slow_fetch_leaves_time_to_score(slow_scoring, monkeypatch):
+    fetched, calls = slow_scoring
+    release = threading.Event()
+
+    def get_and_process_headlines(ticker, trade_period):
+        if ticker == 'DDD':
+            release.wait(5)
+        return fetched[ticker]
+
+    monkeypatch.setattr(main, 'get_and_process_headlines', get_and_process_headlines)
+    try:
+        main.run_anytime(time_budget=1)
+    finally:
+        release.set()
+
+    assert 'DDD' not in calls['trades']
+    assert len(get_best_tickers(calls['trades'])) == 2
+
+
+def test_failed_fetches_are_left_out_of_the_activity_stats(monkeypatch):
+    calls = {}
+    fetched = {'AAA': [make_headline('AAA', i) for i in range(2)], 'CCC': [], 'DDD': None}
+    monkeypatch.setattr(main, 'get_scheduled_tickers', lambda trade_period: list(fetched))
+    monkeypatch.setattr(main, 'get_and_process_headlines', lambda ticker, trade_period: fetched[ticker])
+    monkeypatch.setattr(main, 'generate_record', lambda headline, ticker, processed_headlines:
+                        {'headline': headline, 'response': 'YES', 'model': 'gpt-3.5-turbo', 'score': 1.0})
+    monkeypatch.setattr(main, 'execute_trades', lambda ticker_data, trade_period: None)
+    monkeypatch.setattr(main, 'record_ticker_activity',
+                        lambda tickers, ticker_data, trade_period: calls.update(activity=tickers))
+
+    main.main()
+
+    assert calls['activity'] == ['AAA', 'CCC']
+
+
+def test_coordinator_waits_for_the_queue_on_a_past_date(monkeypatch):
+    calls = {}
+    unfinished = iter([2, 1, 0])
+    monkeypatch.setattr(main, 'get_scheduled_tickers', lambda trade_period: ['AAA', 'BBB'])
+    monkeypatch.setattr(main, 'count_unfinished_tickers', lambda trade_period: next(unfinished))
+    monkeypatch.setattr(main, 'merge_shard_data', lambda trade_period: calls.update(merged=True) or {})
+    monkeypatch.setattr(main, 'execute_trades', lambda ticker_data, trade_period: calls.update(traded=True))
+    monkeypatch.setattr(main, 'record_ticker_activity', lambda tickers, ticker_data, trade_period: None)
+    monkeypatch.setattr(main.time, 'sleep', lambda seconds: None)
+
+    main.run_coordinator()
+
+    assert next(unfinished, None) is None
+    assert calls == {'merged': True, 'traded': True}
+
+
+def test_worker_renews_its_lease_while_scoring(monkeypatch):
+    headlines = [make_headline('AAA', i) for i in range(4)]
+    takeovers = []
+
+    def generate_record(headline, ticker, processed_headlines):
+        time.sleep(0.1)
+        takeovers.append(claim_ticker(TRADE_PERIOD, 'w2', 60, main.MAX_TICKER_ATTEMPTS))
+        return {'headline': headline, 'response': 'YES', 'model': 'gpt-3.5-turbo', 'score': 1.0}
+
+    # Four headlines take twice as long as one lease
+    monkeypatch.setattr(main, 'WORKER_LEASE_SECONDS', 0.2)
+    monkeypatch.setattr(main, 'get_scheduled_tickers', lambda trade_period: ['AAA'])
+    monkeypatch.setattr(main, 'get_and_process_headlines', lambda ticker, trade_period: headlines)
+    monkeypatch.setattr(main, 'generate_record', generate_record)
+
+    main.run_worker('w1')
+
+    assert takeovers == [None] * 4
+    assert count_tickers(TRADE_PERIOD, ['done']) == 1
@@ -0,0 +1,105 @@
+import datetime
+import time
+
+import pytest
+
+from utils.shard_utils import (init_work_queue, reset_work_queue, claim_ticker, extend_lease, complete_ticker, release_ticker,
+                               get_tickers, count_tickers, count_unfinished_tickers, save_shard_data, merge_shard_data)
+
+TRADE_PERIOD = {'trade_buy_time': datetime.datetime(2023, 8, 1, 13, 0)}
+LEASE = 60
+MAX_ATTEMPTS = 3
+
+
+@pytest.fixture(autouse=True)
+def data_directory(tmp_path, monkeypatch):
+    # The queue and shards live under data/<period>, relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def test_claims_each_ticker_once_in_queue_order():
+    init_work_queue(TRADE_PERIOD, ['AAPL', 'MSFT', 'AAPL'])
+    assert claim_ticker(TRADE_PERIOD, 'w1', LEASE, MAX_ATTEMPTS) == 'AAPL'
+    assert claim_ticker(TRADE_PERIOD, 'w2', LEASE, MAX_ATTEMPTS) == 'MSFT'
+    assert claim_ticker(TRADE_PERIOD, 'w3', LEASE, MAX_ATTEMPTS) is None
+    assert count_unfinished_tickers(TRADE_PERIOD) == 2
+
+
+def test_expired_lease_is_reclaimed():
+    init_work_queue(TRADE_PERIOD, ['AAPL'])
+    assert claim_ticker(TRADE_PERIOD, 'w1', 0, MAX_ATTEMPTS) == 'AAPL'
+    time.sleep(0.01)
+    assert claim_ticker(TRADE_PERIOD, 'w2', LEASE, MAX_ATTEMPTS) == 'AAPL'
+
+
+def test_only_the_lease_owner_can_complete():
+    init_work_queue(TRADE_PERIOD, ['AAPL'])
+    claim_ticker(TRADE_PERIOD, 'w1', 0, MAX_ATTEMPTS)
+    time.sleep(0.01)
+    claim_ticker(TRADE_PERIOD, 'w2', LEASE, MAX_ATTEMPTS)
+
+    assert not complete_ticker(TRADE_PERIOD, 'AAPL', 'w1')
+    assert count_unfinished_tickers(TRADE_PERIOD) == 1
+    assert complete_ticker(TRADE_PERIOD, 'AAPL', 'w2')
+    assert count_unfinished_tickers(TRADE_PERIOD) == 0
+    assert get_tickers(TRADE_PERIOD, ['done']) == ['AAPL']
+
+
+def test_extended_lease_is_not_reclaimed():
+    init_work_queue(TRADE_PERIOD, ['AAPL'])
+    claim_ticker(TRADE_PERIOD, 'w1', 0, MAX_ATTEMPTS)
+    assert extend_lease(TRADE_PERIOD, 'AAPL', 'w1', LEASE)
+    time.sleep(0.01)
+    assert claim_ticker(TRADE_PERIOD, 'w2', LEASE, MAX_ATTEMPTS) is None
+
+
+def test_only_the_lease_owner_can_extend():
+    init_work_queue(TRADE_PERIOD, ['AAPL'])
+    claim_ticker(TRADE_PERIOD, 'w1', 0, MAX_ATTEMPTS)
+    time.sleep(0.01)
+    claim_ticker(TRADE_PERIOD, 'w2', LEASE, MAX_ATTEMPTS)
+    assert not extend_lease(TRADE_PERIOD, 'AAPL', 'w1', LEASE)
+    complete_ticker(TRADE_PERIOD, 'AAPL', 'w2')
+    assert not extend_lease(TRADE_PERIOD, 'AAPL', 'w2', LEASE)
+
+
+def test_ticker_fails_after_max_attempts():
+    init_work_queue(TRADE_PERIOD, ['AAPL', 'MSFT'])
+    for attempt in range(MAX_ATTEMPTS):
+        assert claim_ticker(TRADE_PERIOD, 'w1', 0, MAX_ATTEMPTS) is not None
+        time.sleep(0.01)
+    # Expired leases: one ticker reached the limit and fails, the other is claimed again
+    for worker_id in ('w2', 'w3', 'w4'):
+        claim_ticker(TRADE_PERIOD, worker_id, 0, MAX_ATTEMPTS)
+        time.sleep(0.01)
+    assert claim_ticker(TRADE_PERIOD, 'w5', LEASE, MAX_ATTEMPTS) is None
+    assert count_tickers(TRADE_PERIOD, ['failed']) == 2
+    assert count_unfinished_tickers(TRADE_PERIOD) == 0
+
+
+def test_released_ticker_is_retried_then_failed():
+    init_work_queue(TRADE_PERIOD, ['AAPL'])
+    for attempt in range(MAX_ATTEMPTS):
+        assert claim_ticker(TRADE_PERIOD, 'w1', LEASE, MAX_ATTEMPTS) == 'AAPL'
+        release_ticker(TRADE_PERIOD, 'AAPL', 'w1', MAX_ATTEMPTS)
+    assert claim_ticker(TRADE_PERIOD, 'w1', LEASE, MAX_ATTEMPTS) is None
+    assert count_tickers(TRADE_PERIOD, ['failed']) == 1
+
+
+def test_reset_starts_a_new_run():
+    init_work_queue(TRADE_PERIOD, ['AAPL'])
+    claim_ticker(TRADE_PERIOD, 'w1', LEASE, MAX_ATTEMPTS)
+    complete_ticker(TRADE_PERIOD, 'AAPL', 'w1')
+    save_shard_data({'AAPL': {'records': [1]}}, TRADE_PERIOD, 'w1')
+
+    reset_work_queue(TRADE_PERIOD, ['AAPL', 'MSFT'])
+    assert count_unfinished_tickers(TRADE_PERIOD) == 2
+    assert merge_shard_data(TRADE_PERIOD) == {}
+
+
+def test_merge_keeps_the_entry_with_most_records():
+    save_shard_data({'AAPL': {'records': [1]}, 'MSFT': {'records': [1, 2]}}, TRADE_PERIOD, 'w1')
+    save_shard_data({'AAPL': {'records': [1, 2, 3]}}, TRADE_PERIOD, 'w2')
+    merged = merge_shard_data(TRADE_PERIOD)
+    assert len(merged['AAPL']['records']) == 3
+    assert len(merged['MSFT']['records']) == 2
@@ -0,0 +1,93 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from utils.sweep_utils import load_scored_periods, aggregate_scores, run_sweep
+from utils.trading_utils import calculate_average_score, get_best_tickers, get_worst_tickers
+
+PERIODS = ['20230801_0630', '20230801_1300', '20230802_0630']
+GRID = {
+    'top_k': [1, 3, 5, 50],
+    'min_headlines': [2],
+    'score_methods': ['mean'],
+    'half_life_hours': [],
+    'excluded_sources': [[]],
+}
+
+
+def make_ticker_data(rng, buy_time):
+    tickers = [f'T{i:03d}' for i in range(40)]
+    # A different order in every period, so tie-breaking has to follow each period's own order
+    rng.shuffle(tickers)
+    ticker_data = {}
+    for ticker in tickers[:rng.randint(25, 40)]:
+        # Few records with scores in {-1, 0, 1} give lots of ties
+        records = [
+            {
+                'headline': {'publish_time': f'{buy_time[:10]} 0{rng.randint(1, 6)}:00:00', 'headline': 'h',
+                             'url': f'{ticker}/{i}', 'source': rng.choice(['Reuters', 'Zacks'])},
+                'score': rng.choice([1.0, 0.0, -1.0]),
+            }
+            for i in range(rng.randint(1, 4))
+        ]
+        scores = [record['score'] for record in records]
+        ticker_data[ticker] = {
+            'records': records,
+            'average_score': float(calculate_average_score(scores)),
+            'total_score': float(sum(scores)),
+            'buy_time': buy_time,
+            'sell_time': buy_time,
+        }
+    return ticker_data
+
+
+@pytest.fixture
+def periods(tmp_path):
+    rng = random.Random(7)
+    periods = {}
+    for period in PERIODS:
+        buy_time = f'{period[:4]}-{period[4:6]}-{period[6:8]} {period[9:11]}:{period[11:]}'
+        periods[period] = make_ticker_data(rng, buy_time)
+        (tmp_path / period).mkdir()
+        with open(tmp_path / period / 'ticker_data.json', 'w') as outfile:
+            json.dump(periods[period], outfile)
+    return str(tmp_path), periods
+
+
+def test_mean_selection_matches_live_selection(periods):
+    data_directory, ticker_data = periods
+    results = run_sweep(load_scored_periods(data_directory), GRID)
+
+    for result in results:
+        for period, data in ticker_data.items():
+            decisions = result['decisions'][period]
+            assert decisions['buy'] == [ticker for ticker, _ in get_best_tickers(data, result['top_k'])]
+            assert decisions['short_sell'] == [ticker for ticker, _ in get_worst_tickers(data, result['top_k'])]
+
+
+def test_sum_and_decayed_scores(periods):
+    data_directory, ticker_data = periods
+    scored = load_scored_periods(data_directory)
+    period_index = scored['periods'].index(PERIODS[1])
+    data = ticker_data[PERIODS[1]]
+
+    counts, sums = aggregate_scores(scored, 'sum', [])
+    _, decayed = aggregate_scores(scored, 'decayed', [], half_life_hours=2)
+    _, without_zacks = aggregate_scores(scored, 'mean', ['Zacks'])
+    for ticker, info in data.items():
+        ticker_index = scored['tickers'].index(ticker)
+        assert counts[period_index, ticker_index] == len(info['records'])
+        assert sums[period_index, ticker_index] == pytest.approx(info['total_score'])
+
+        ages = [13 - int(record['headline']['publish_time'][11:13]) for record in info['records']]
+        weights = [0.5 ** (age / 2) for age in ages]
+        expected = sum(w * record['score'] for w, record in zip(weights, info['records'])) / sum(weights)
+        assert decayed[period_index, ticker_index] == pytest.approx(expected)
+
+        reuters = [record['score'] for record in info['records'] if record['headline']['source'] == 'Reuters']
+        if reuters:
+            assert without_zacks[period_index, ticker_index] == pytest.approx(np.mean(reuters))
+        else:
+            assert np.isnan(without_zacks[period_index, ticker_index])
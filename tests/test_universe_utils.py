@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import utils.universe_utils as universe_utils
+from utils.universe_utils import get_scheduled_tickers, record_ticker_activity, get_tier, load_universe, get_period_number
+from config import TICKERS, MIN_TIER_PERIODS, COLD_FETCH_EVERY
+
+
+def trade_period(day):
+    return {'trade_buy_time': pd.Timestamp(f'2023-08-{day:02d} 13:00', tz='US/Pacific')}
+
+
+@pytest.fixture(autouse=True)
+def no_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(universe_utils, 'UNIVERSE_STATS_PATH', str(tmp_path / 'universe_stats.json'))
+
+
+def test_default_universe_has_no_duplicates():
+    assert load_universe() == list(dict.fromkeys(TICKERS))
+
+
+def test_fresh_checkout_scans_the_whole_universe():
+    tickers = load_universe()
+    assert sorted(get_scheduled_tickers(trade_period(1), tickers)) == sorted(tickers)
+
+
+def test_quiet_tickers_rotate_once_measured():
+    tickers = [f'T{i}' for i in range(200)]
+    busy = set(tickers[:10])
+    for day in range(1, MIN_TIER_PERIODS + 1):
+        assert len(get_scheduled_tickers(trade_period(day), tickers)) == len(tickers)
+        record_ticker_activity(tickers, {ticker: {'records': [{}] * 5} for ticker in busy}, trade_period(day))
+
+    stats = universe_utils.load_activity_stats()
+    assert {get_tier(stats, ticker) for ticker in busy} == {'hot'}
+    assert {get_tier(stats, ticker) for ticker in tickers[10:]} == {'cold'}
+
+    scheduled = get_scheduled_tickers(trade_period(10), tickers)
+    assert scheduled[:10] == tickers[:10]
+    assert len(scheduled) < 10 + 2 * len(tickers) / COLD_FETCH_EVERY + 10
+
+
+def test_half_day_periods_are_numbered_by_the_calendar():
+    def period_number(buy_time):
+        return get_period_number({'trade_buy_time': pd.Timestamp(buy_time, tz='US/Pacific')})
+
+    # Thanksgiving is a holiday and the day after closes at 10:00 Pacific
+    numbers = [period_number(buy_time) for buy_time in
+               ('2023-11-22 13:00', '2023-11-24 06:30', '2023-11-24 10:00', '2023-11-27 06:30')]
+    assert numbers == list(range(numbers[0], numbers[0] + 4))
@@ -0,0 +1,392 @@
+#/utils/cache_utils.py
+import fcntl
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import (SEMANTIC_CACHE_PATH, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_DIMENSIONS,
+                    SEMANTIC_CACHE_MAX_AGE_DAYS, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_POLARITY_WORDS)
+
+# Per-ticker cache, loaded on first use:
+# {ticker: {"entries": [...], "vectors": np.ndarray, "polarities": np.ndarray, "published": np.ndarray}}
+SEMANTIC_CACHE = {}
+SEMANTIC_CACHE_LOADED = False
+CACHE_STATS = {"lookups": 0, "hits": 0, "latency": 0.0}
+# Headlines can be scored from several threads (see main.run_anytime)
+CACHE_LOCK = threading.RLock()
+
+
+def embed_headline(text: str) -> np.ndarray:
+    """
+    Embeds a headline as a normalized vector of hashed word and character n-grams.
+
+    Parameters
+    ----------
+    text : str
+        The headline text.
+
+    Returns
+    -------
+    np.ndarray
+        Unit length vector of size SEMANTIC_CACHE_DIMENSIONS.
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    joined = f" {' '.join(words)} "
+    features += [joined[i:i + 4] for i in range(len(joined) - 3)]
+
+    vector = np.zeros(SEMANTIC_CACHE_DIMENSIONS, dtype=np.float32)
+    for feature in features:
+        # crc32 rather than hash() so vectors are the same in every process
+        vector[zlib.crc32(feature.encode()) % SEMANTIC_CACHE_DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def get_polarity(text: str) -> str:
+    """
+    Gets the directions a headline's wording points in.
+
+    Parameters
+    ----------
+    text : str
+        The headline text.
+
+    Returns
+    -------
+    str
+        '+' and/or '-' for every SEMANTIC_CACHE_POLARITY_WORDS group with a word in the headline, '' if none.
+    """
+    words = re.findall(r"[a-z]+", text.lower())
+    polarity = ''
+    for sign, group in (('+', 'positive'), ('-', 'negative')):
+        stems = SEMANTIC_CACHE_POLARITY_WORDS[group]
+        if any(word == stem or (len(stem) >= 4 and word.startswith(stem)) for word in words for stem in stems):
+            polarity += sign
+    return polarity
+
+
+def get_publish_timestamp(publish_time: Any) -> float:
+    # Seconds since the epoch, publish times are compared as stored (all naive or all timezone aware)
+    return pd.Timestamp(publish_time).timestamp()
+
+
+def index_entry(entry: Dict[str, Any]) -> Tuple[np.ndarray, str, float]:
+    """
+    Computes what the lookup needs to know about a cache entry.
+
+    Parameters
+    ----------
+    entry : Dict[str, Any]
+        A cached verdict.
+
+    Returns
+    -------
+    Tuple[np.ndarray, str, float]
+        The entry's embedding, polarity and publish timestamp.
+    """
+    return embed_headline(entry["headline"]), get_polarity(entry["headline"]), get_publish_timestamp(entry["publish_time"])
+
+
+def build_ticker_index(entries: List[Dict[str, Any]], known: Optional[Dict[str, Tuple[np.ndarray, str, float]]] = None) -> Dict[str, Any]:
+    """
+    Builds the lookup structure for one ticker's cache entries.
+
+    Parameters
+    ----------
+    entries : List[Dict[str, Any]]
+        The cached verdicts for the ticker.
+    known : Optional[Dict[str, Tuple[np.ndarray, str, float]]]
+        Already computed index_entry results keyed by url, only the other entries are embedded.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Dictionary with the entries, a matrix holding one embedding per entry, and each entry's polarity and publish timestamp.
+    """
+    known = known or {}
+    rows = [known[entry["url"]] if entry["url"] in known else index_entry(entry) for entry in entries]
+    if rows:
+        vectors = np.vstack([row[0] for row in rows])
+    else:
+        vectors = np.zeros((0, SEMANTIC_CACHE_DIMENSIONS), dtype=np.float32)
+    polarities = np.array([row[1] for row in rows], dtype=object)
+    published = np.array([row[2] for row in rows], dtype=np.float64)
+    return {"entries": entries, "vectors": vectors, "polarities": polarities, "published": published}
+
+
+def get_known_rows() -> Dict[str, Dict[str, Tuple[np.ndarray, str, float]]]:
+    """
+    Collects the index rows of the entries currently in memory.
+
+    Returns
+    -------
+    Dict[str, Dict[str, Tuple[np.ndarray, str, float]]]
+        index_entry results keyed by ticker and url.
+    """
+    return {
+        ticker: {
+            entry["url"]: (index["vectors"][i], index["polarities"][i], index["published"][i])
+            for i, entry in enumerate(index["entries"])
+        }
+        for ticker, index in SEMANTIC_CACHE.items()
+    }
+
+
+def get_vectors_path() -> str:
+    # The embeddings are stored next to the cache, so loading doesn't have to embed every headline again
+    return f'{os.path.splitext(SEMANTIC_CACHE_PATH)[0]}.npz'
+
+
+def read_vectors_file() -> Dict[str, Dict[str, Tuple[np.ndarray, str, float]]]:
+    """
+    Reads the stored index rows from the vectors file.
+
+    Returns
+    -------
+    Dict[str, Dict[str, Tuple[np.ndarray, str, float]]]
+        index_entry results keyed by ticker and url, empty if there is no usable vectors file.
+    """
+    path = get_vectors_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path) as data:
+            if int(data["dimensions"]) != SEMANTIC_CACHE_DIMENSIONS:
+                return {}
+            tickers, urls, polarities, published = data["tickers"], data["urls"], data["polarities"], data["published"]
+            indptr, indices, values = data["indptr"], data["indices"], data["values"]
+    except (OSError, ValueError, KeyError) as e:
+        logging.info(f"Could not read {path}: {e}, embedding the cached headlines again")
+        return {}
+
+    known = {}
+    for i, (ticker, url) in enumerate(zip(tickers.tolist(), urls.tolist())):
+        vector = np.zeros(SEMANTIC_CACHE_DIMENSIONS, dtype=np.float32)
+        vector[indices[indptr[i]:indptr[i + 1]]] = values[indptr[i]:indptr[i + 1]]
+        known.setdefault(ticker, {})[url] = (vector, str(polarities[i]), float(published[i]))
+    return known
+
+
+def write_vectors_file(path: str) -> None:
+    """
+    Writes the index rows of the entries in memory to path.
+
+    The hashed n-gram vectors are mostly zeros, so only their non-zero values are stored (one row per entry, CSR style).
+
+    Parameters
+    ----------
+    path : str
+        The file to write.
+    """
+    tickers, urls, polarities, published, row_lengths, indices, values = [], [], [], [], [], [], []
+    for ticker, index in SEMANTIC_CACHE.items():
+        tickers += [ticker] * len(index["entries"])
+        urls += [entry["url"] for entry in index["entries"]]
+        polarities += list(index["polarities"])
+        published.append(index["published"])
+        rows, columns = np.nonzero(index["vectors"])
+        row_lengths.append(np.bincount(rows, minlength=len(index["entries"])))
+        indices.append(columns)
+        values.append(index["vectors"][rows, columns])
+
+    with open(path, 'wb') as outfile:
+        np.savez(
+            outfile,
+            dimensions=SEMANTIC_CACHE_DIMENSIONS,
+            tickers=np.array(tickers, dtype=str),
+            urls=np.array(urls, dtype=str),
+            polarities=np.array(polarities, dtype=str),
+            published=np.concatenate(published or [np.zeros(0)]),
+            indptr=np.concatenate([[0], np.cumsum(np.concatenate(row_lengths or [np.zeros(0, dtype=np.int64)]))]),
+            indices=np.concatenate(indices or [np.zeros(0, dtype=np.int64)]).astype(np.int32),
+            values=np.concatenate(values or [np.zeros(0, dtype=np.float32)]).astype(np.float32),
+        )
+
+
+def read_cache_file() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Reads the cached entries from SEMANTIC_CACHE_PATH.
+
+    Returns
+    -------
+    Dict[str, List[Dict[str, Any]]]
+        Cached entries keyed by ticker, empty if there is no cache file yet.
+    """
+    if not os.path.exists(SEMANTIC_CACHE_PATH):
+        return {}
+    with open(SEMANTIC_CACHE_PATH, 'r') as infile:
+        return json.load(infile)
+
+
+def load_semantic_cache() -> None:
+    """
+    Loads the semantic cache and its stored embeddings from disk, evicting stale entries.
+    """
+    global SEMANTIC_CACHE_LOADED
+    rebuild_semantic_cache(read_cache_file(), read_vectors_file())
+    SEMANTIC_CACHE_LOADED = True
+
+
+def rebuild_semantic_cache(cache_entries: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                           known: Optional[Dict[str, Dict[str, Tuple[np.ndarray, str, float]]]] = None) -> None:
+    """
+    Rebuilds the per-ticker indexes, dropping entries older than SEMANTIC_CACHE_MAX_AGE_DAYS
+    and keeping at most SEMANTIC_CACHE_MAX_ENTRIES of the newest entries per ticker.
+
+    Parameters
+    ----------
+    cache_entries : Optional[Dict[str, List[Dict[str, Any]]]]
+        Entries to rebuild from, keyed by ticker. Defaults to the entries currently in memory.
+    known : Optional[Dict[str, Dict[str, Tuple[np.ndarray, str, float]]]]
+        Already computed index rows keyed by ticker and url. Defaults to the rows currently in memory,
+        so only entries that are new to this process are embedded.
+    """
+    if cache_entries is None:
+        cache_entries = {ticker: index["entries"] for ticker, index in SEMANTIC_CACHE.items()}
+    if known is None:
+        known = get_known_rows()
+
+    min_added = time.time() - SEMANTIC_CACHE_MAX_AGE_DAYS * 24 * 60 * 60
+    SEMANTIC_CACHE.clear()
+    for ticker, entries in cache_entries.items():
+        entries = [entry for entry in entries if entry["added"] >= min_added]
+        entries = sorted(entries, key=lambda entry: entry["added"])[-SEMANTIC_CACHE_MAX_ENTRIES:]
+        SEMANTIC_CACHE[ticker] = build_ticker_index(entries, known.get(ticker))
+
+
+def save_semantic_cache() -> None:
+    """
+    Saves the semantic cache and its embeddings to disk, merged with whatever other processes saved in the meantime.
+
+    A lock file next to the cache keeps workers sharing the cache (see utils/shard_utils.py) from
+    merging at the same time, and each process writes through its own temporary files.
+    """
+    if not SEMANTIC_CACHE_LOADED:
+        return
+
+    directory = os.path.dirname(SEMANTIC_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with CACHE_LOCK, open(f'{SEMANTIC_CACHE_PATH}.lock', 'w') as lock_file:
+        fcntl.lockf(lock_file, fcntl.LOCK_EX)
+        try:
+            cache_entries = read_cache_file()
+            for ticker, index in SEMANTIC_CACHE.items():
+                merged = {entry["url"]: entry for entry in cache_entries.get(ticker, [])}
+                merged.update({entry["url"]: entry for entry in index["entries"]})
+                cache_entries[ticker] = list(merged.values())
+            # Only the entries other processes added since this one loaded the cache are embedded here
+            rebuild_semantic_cache(cache_entries)
+
+            tmp_suffix = f'{socket.gethostname()}.{os.getpid()}.tmp'
+            with open(f'{SEMANTIC_CACHE_PATH}.{tmp_suffix}', 'w') as outfile:
+                json.dump({ticker: index["entries"] for ticker, index in SEMANTIC_CACHE.items()}, outfile, default=str)
+            write_vectors_file(f'{get_vectors_path()}.{tmp_suffix}')
+            os.replace(f'{SEMANTIC_CACHE_PATH}.{tmp_suffix}', SEMANTIC_CACHE_PATH)
+            os.replace(f'{get_vectors_path()}.{tmp_suffix}', get_vectors_path())
+        finally:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+
+def lookup_verdict(ticker: str, headline: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Finds a past verdict for a headline that says the same thing as the given one, in the same direction.
+    Only headlines published no later than the given one are considered, so a backtest can't see later stories.
+
+    Parameters
+    ----------
+    ticker : str
+        The ticker symbol.
+    headline : Dict[str, Any]
+        The headline dictionary with 'headline' and 'publish_time'.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        The most similar cached entry if its similarity is at least SEMANTIC_CACHE_THRESHOLD, otherwise None.
+    """
+    start_time = time.time()
+    vector = embed_headline(headline["headline"])
+    polarity = get_polarity(headline["headline"])
+    published = get_publish_timestamp(headline["publish_time"])
+    match = None
+    with CACHE_LOCK:
+        if not SEMANTIC_CACHE_LOADED:
+            load_semantic_cache()
+
+        index = SEMANTIC_CACHE.get(ticker)
+        if index is not None and len(index["entries"]):
+            # Vectors are unit length, so the dot product is the cosine similarity
+            similarities = index["vectors"] @ vector
+            # A headline pointing the other way is the worst possible hit, however similar the wording
+            similarities[index["polarities"] != polarity] = -1.0
+            similarities[index["published"] > published] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] >= SEMANTIC_CACHE_THRESHOLD:
+                match = index["entries"][best]
+
+        CACHE_STATS["lookups"] += 1
+        CACHE_STATS["hits"] += match is not None
+        CACHE_STATS["latency"] += time.time() - start_time
+    return match
+
+
+def add_verdict(ticker: str, headline: Dict[str, Any], response: str, score: float, model_name: Optional[str] = None) -> None:
+    """
+    Adds a scored headline to the semantic cache.
+
+    Parameters
+    ----------
+    ticker : str
+        The ticker symbol.
+    headline : Dict[str, Any]
+        The headline dictionary with 'headline', 'url' and 'publish_time'.
+    response : str
+        The model's response to the headline.
+    score : float
+        The score derived from the response.
+    model_name : Optional[str]
+        The model that gave the response.
+    """
+    entry = {
+        "headline": headline["headline"],
+        "url": headline["url"],
+        "publish_time": str(headline["publish_time"]),
+        "response": response,
+        "score": score,
+        "model": model_name,
+        "added": time.time(),
+    }
+    vector, polarity, published = index_entry(entry)
+    with CACHE_LOCK:
+        if not SEMANTIC_CACHE_LOADED:
+            load_semantic_cache()
+        index = SEMANTIC_CACHE.setdefault(ticker, build_ticker_index([]))
+        index["entries"].append(entry)
+        index["vectors"] = np.vstack([index["vectors"], vector])
+        index["polarities"] = np.append(index["polarities"], polarity)
+        index["published"] = np.append(index["published"], published)
+
+
+def report_semantic_cache_stats() -> None:
+    """
+    Logs the semantic cache hit rate and average lookup latency.
+    """
+    if not CACHE_STATS["lookups"]:
+        return
+    message = (f"Semantic cache: {CACHE_STATS['hits']}/{CACHE_STATS['lookups']} hits "
+               f"({CACHE_STATS['hits'] / CACHE_STATS['lookups']:.1%}), "
+               f"average lookup latency {CACHE_STATS['latency'] / CACHE_STATS['lookups'] * 1000:.2f}ms")
+    print(message)
+    logging.info(message)
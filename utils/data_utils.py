@@ -70,7 +70,7 @@ def get_headlines(ticker: str, trade_period) -> List[Dict[str, str]]:
     Returns
     -------
     List[Dict]
-        A list of dictionaries containing 'date', 'time', 'headline' and 'url'.
+        A list of dictionaries containing 'publish_time', 'headline', 'url' and 'source'.
     """
     headlines_data = get_news(ticker, trade_period)
     headlines = []
@@ -79,6 +79,7 @@ def get_headlines(ticker: str, trade_period) -> List[Dict[str, str]]:
             'publish_time': datetime.datetime.strptime(headline_data['date'] + ' ' + headline_data['time'], '%Y-%m-%d %H:%M'),
             'headline': headline_data['headline'],
             'url': headline_data['url'],
+            'source': headline_data['source'],
         }
         headlines.append(headline)
     return headlines
@@ -18,7 +18,7 @@ STOCK_PAGE = {}
 
 connection_settings = dict(
     CONCURRENT_CONNECTIONS=30,
-    CONNECTION_TIMEOUT=30000,
+    CONNECTION_TIMEOUT=30000,  # In milliseconds
 )
 
 class ConnectionTimeout(Exception):
@@ -26,7 +26,7 @@ class ConnectionTimeout(Exception):
 
     def __init__(self, webpage_link):
         super(ConnectionTimeout, self).__init__(
-            f'Connection timed out after {connection_settings["CONNECTION_TIMEOUT"]} while trying to reach {webpage_link}'
+            f'Connection timed out after {connection_settings["CONNECTION_TIMEOUT"]}ms while trying to reach {webpage_link}'
         )
 
 def http_request_get(
@@ -44,6 +44,7 @@ def http_request_get(
                 params=payload,
                 verify=False,
                 headers={"User-Agent": user_agent},
+                timeout=connection_settings["CONNECTION_TIMEOUT"] / 1000,
             )
         else:
             content = requests.get(
@@ -51,6 +52,7 @@ def http_request_get(
                 params=payload,
                 verify=False,
                 headers={"User-Agent": user_agent},
+                timeout=connection_settings["CONNECTION_TIMEOUT"] / 1000,
             )
         content.raise_for_status()
               # Raise HTTPError for bad requests (4xx or 5xx)
@@ -1,11 +1,13 @@
 import openai
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from typing import Dict, Any
-from config import OPENAI_API_KEY
+from config import OPENAI_API_KEY, MODEL_TIERS, HEDGE_WORDS
+import logging
+import threading
 import time
 
 openai.api_key = OPENAI_API_KEY
-model = "gpt-3.5-turbo" # You can replace this with "gpt-4" if available and if you want to use it
+model = MODEL_TIERS[0]["model"] # The first (cheapest) tier of the cascade, see MODEL_TIERS in config.py
 
 def generate_prompt(headline: str, company_name: str) -> List[Dict[str, str]]:
     """
@@ -38,15 +40,64 @@ def generate_prompt(headline: str, company_name: str) -> List[Dict[str, str]]:
     return prompt_template
 
 
-# Define the rate limit parameters
+# Define the rate limit parameters, used for models that are not listed in MODEL_TIERS
 MAX_CALLS = 30
 PERIOD = 60  # In seconds
-LAST_CALL = time.time()
+MAX_CONCURRENCY = 1
 RETRY_DELAY = 5  # Delay in seconds before retrying after a rate limit error
 MAX_RETRIES = 3  # Maximum number of retries
 
+# Per-model rate limiting state and usage stats, created on first use
+TIER_STATE = {}
+TIER_STATS = {}
+TIER_STATE_LOCK = threading.Lock()
 
-def get_gpt3_response(prompt: List[Dict[str, str]]) -> Dict[str, Any]:
+
+def get_tier_state(model_name: str) -> Dict[str, Any]:
+    """
+    Gets the rate limiting state for a model, creating it from MODEL_TIERS on first use.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Dictionary with the model's minimum call interval, concurrency semaphore, lock and last call time.
+    """
+    with TIER_STATE_LOCK:
+        if model_name not in TIER_STATE:
+            tier = next((tier for tier in MODEL_TIERS if tier["model"] == model_name), {})
+            TIER_STATE[model_name] = {
+                "interval": tier.get("period", PERIOD) / tier.get("max_calls", MAX_CALLS),
+                "semaphore": threading.BoundedSemaphore(tier.get("max_concurrency", MAX_CONCURRENCY)),
+                "lock": threading.Lock(),
+                "last_call": 0.0,
+            }
+            TIER_STATS[model_name] = {"headlines": 0, "failures": 0, "calls": 0, "latency": 0.0, "tokens": 0, "escalations": 0}
+        return TIER_STATE[model_name]
+
+
+def wait_for_rate_limit(state: Dict[str, Any]) -> None:
+    """
+    Sleeps until the model's rate budget allows another call, and reserves that call slot.
+
+    Parameters
+    ----------
+    state : Dict[str, Any]
+        The model's rate limiting state from get_tier_state.
+    """
+    with state["lock"]:
+        next_call = max(time.time(), state["last_call"] + state["interval"])
+        state["last_call"] = next_call
+    delay = next_call - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def get_gpt3_response(prompt: List[Dict[str, str]], model_name: str = None) -> Dict[str, Any]:
     """
     Gets GPT-3.5-turbo or GPT-4's response to a prompt.
 
@@ -54,27 +105,34 @@ def get_gpt3_response(prompt: List[Dict[str, str]]) -> Dict[str, Any]:
     ----------
     prompt : List[Dict[str, str]]
         The prompt for GPT-3.5-turbo or GPT-4.
+    model_name : str
+        The model to ask. Defaults to the first tier of MODEL_TIERS.
 
     Returns
     -------
     Dict[str, Any]
         The response from GPT-3.5-turbo or GPT-4.
     """
-    global LAST_CALL
+    model_name = model_name or model
+    state = get_tier_state(model_name)
     retries = 0
 
     while retries < MAX_RETRIES:
         try:
-            time_since_last_call = time.time() - LAST_CALL
-            if time_since_last_call < 1/MAX_CALLS*PERIOD:
-                time.sleep(1/MAX_CALLS*PERIOD - time_since_last_call)
+            with state["semaphore"]:
+                wait_for_rate_limit(state)
+                start_time = time.time()
+                response = openai.ChatCompletion.create(
+                    model=model_name,
+                    messages=prompt
+                )
+                latency = time.time() - start_time
 
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=prompt
-            )
-
-            LAST_CALL = time.time()
+            with TIER_STATE_LOCK:
+                stats = TIER_STATS[model_name]
+                stats["calls"] += 1
+                stats["latency"] += latency
+                stats["tokens"] += response.get('usage', {}).get('total_tokens', 0)
             return response['choices'][0]['message']['content'].strip().replace('\n', ' ')
 
         except openai.error.RateLimitError:
@@ -86,6 +144,88 @@ def get_gpt3_response(prompt: List[Dict[str, str]]) -> Dict[str, Any]:
             return None
 
 
+def is_uncertain_response(message_content: str) -> bool:
+    """
+    Checks whether a response should be escalated to the next model tier.
+
+    A response is uncertain if it is UNKNOWN, if its first word can't be mapped to a score,
+    or if the explanation hedges (see HEDGE_WORDS in config.py).
+
+    Parameters
+    ----------
+    message_content : str
+        The response from GPT-3.5-turbo or GPT-4.
+
+    Returns
+    -------
+    bool
+        True if the response is uncertain.
+    """
+    if not message_content:
+        return True
+    first_word, _, explanation = message_content.partition(' ')
+    first_word = first_word.upper()
+    if "UNKNOWN" in first_word or "UNCERTAIN" in first_word:
+        return True
+    if not any(word in first_word for word in ("YES", "GOOD", "NO", "BAD")):
+        # The unexpected response branch of process_gpt3_response
+        return True
+    explanation_words = {word.strip('.,;:!?').lower() for word in explanation.split()}
+    return any(word in explanation_words for word in HEDGE_WORDS)
+
+
+def get_cascade_response(prompt: List[Dict[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Asks the model tiers in order, escalating only while the response is uncertain.
+
+    Parameters
+    ----------
+    prompt : List[Dict[str, str]]
+        The prompt for GPT-3.5-turbo or GPT-4.
+
+    Returns
+    -------
+    Tuple[Optional[str], Optional[str]]
+        The final response and the name of the model that gave it.
+    """
+    response, model_name = None, None
+    for i, tier in enumerate(MODEL_TIERS):
+        tier_response = get_gpt3_response(prompt, tier["model"])
+        escalate = i + 1 < len(MODEL_TIERS)
+        if tier_response is not None:
+            # Keep the best answer we have in case a later tier fails
+            response, model_name = tier_response, tier["model"]
+        if response is not None and not is_uncertain_response(response):
+            escalate = False
+
+        get_tier_state(tier["model"])
+        with TIER_STATE_LOCK:
+            stats = TIER_STATS[tier["model"]]
+            stats["headlines"] += 1
+            stats["failures"] += tier_response is None
+            stats["escalations"] += escalate
+        if not escalate:
+            break
+    return response, model_name
+
+
+def report_cascade_stats() -> None:
+    """
+    Logs per-tier headline count, failures, average latency, token use and escalation rate.
+    """
+    for tier in MODEL_TIERS:
+        stats = TIER_STATS.get(tier["model"])
+        if not stats or not stats["headlines"]:
+            continue
+        # Escalations are counted per headline sent to the tier, failed requests included
+        message = (f"Model {tier['model']}: {stats['headlines']} headlines, {stats['failures']} failed, "
+                   f"average latency {stats['latency'] / max(stats['calls'], 1):.2f}s, "
+                   f"{stats['tokens']} tokens, "
+                   f"escalation rate {stats['escalations'] / stats['headlines']:.1%}")
+        print(message)
+        logging.info(message)
+
+
 
 
 def process_gpt3_response(message_content: Dict[str, Any]) -> float:
@@ -0,0 +1,389 @@
+#/utils/shard_utils.py
+import json
+import os
+import shutil
+import sqlite3
+import time
+from typing import List, Optional
+
+def get_queue_path(trade_period) -> str:
+    """
+    Gets the path of the shared work queue database for a trade period.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+
+    Returns
+    -------
+    str
+        Path to the SQLite work queue for the period.
+    """
+    datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
+    directory = f'data/{datetime_string}'
+    os.makedirs(directory, exist_ok=True)
+    return f'{directory}/work_queue.db'
+
+
+def connect_queue(trade_period) -> sqlite3.Connection:
+    """
+    Opens the work queue database, creating the table if it does not exist yet.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Connection to the work queue, in autocommit mode so that claims can use explicit transactions.
+    """
+    connection = sqlite3.connect(get_queue_path(trade_period), timeout=30, isolation_level=None)
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS work_queue (
+            ticker TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'pending',
+            worker_id TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    return connection
+
+
+def init_work_queue(trade_period, tickers: List[str]) -> None:
+    """
+    Adds tickers to the work queue. Tickers that are already queued keep their current state,
+    use reset_work_queue to start a new run.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    tickers : List[str]
+        The ticker symbols to scan.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.executemany(
+            "INSERT OR IGNORE INTO work_queue (ticker) VALUES (?)",
+            [(ticker,) for ticker in dict.fromkeys(tickers)]
+        )
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+def reset_work_queue(trade_period, tickers: List[str]) -> None:
+    """
+    Starts a new run for the period: replaces the queue with the given tickers, all pending, and
+    removes the shard files of earlier runs so they can't be merged into this one.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    tickers : List[str]
+        The ticker symbols to scan.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("DELETE FROM work_queue")
+        connection.executemany(
+            "INSERT INTO work_queue (ticker) VALUES (?)",
+            [(ticker,) for ticker in dict.fromkeys(tickers)]
+        )
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+    datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
+    shutil.rmtree(f'data/{datetime_string}/shards', ignore_errors=True)
+
+
+def claim_ticker(trade_period, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[str]:
+    """
+    Claims the next pending ticker, or a ticker whose lease has expired because its worker crashed.
+    Expired tickers that already had max_attempts claims are marked failed instead of claimed again.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    worker_id : str
+        Identifier of the worker making the claim.
+    lease_seconds : float
+        How long the claim is valid before another worker may take the ticker over.
+    max_attempts : int
+        How many times a ticker may be claimed before it is given up on.
+
+    Returns
+    -------
+    Optional[str]
+        The claimed ticker, or None if there is nothing left to claim.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can't claim the same row
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute(
+            """
+            UPDATE work_queue SET status = 'failed', lease_expires = NULL
+            WHERE status = 'claimed' AND lease_expires < ? AND attempts >= ?
+            """,
+            (now, max_attempts)
+        )
+        row = connection.execute(
+            """
+            SELECT ticker FROM work_queue
+            WHERE status = 'pending' OR (status = 'claimed' AND lease_expires < ?)
+            ORDER BY attempts, rowid
+            LIMIT 1
+            """,
+            (now,)
+        ).fetchone()
+        if row is None:
+            connection.execute("COMMIT")
+            return None
+        connection.execute(
+            """
+            UPDATE work_queue
+            SET status = 'claimed', worker_id = ?, lease_expires = ?, attempts = attempts + 1
+            WHERE ticker = ?
+            """,
+            (worker_id, now + lease_seconds, row[0])
+        )
+        connection.execute("COMMIT")
+        return row[0]
+    finally:
+        connection.close()
+
+
+def extend_lease(trade_period, ticker: str, worker_id: str, lease_seconds: float) -> bool:
+    """
+    Renews a worker's claim on a ticker, so a ticker that takes long to process isn't taken over while it is being worked on.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    ticker : str
+        The ticker symbol.
+    worker_id : str
+        Identifier of the worker holding the claim.
+    lease_seconds : float
+        How long from now the claim is valid.
+
+    Returns
+    -------
+    bool
+        False if the worker no longer holds the claim.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        cursor = connection.execute(
+            """
+            UPDATE work_queue SET lease_expires = ?
+            WHERE ticker = ? AND worker_id = ? AND status = 'claimed'
+            """,
+            (time.time() + lease_seconds, ticker, worker_id)
+        )
+        return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+
+def complete_ticker(trade_period, ticker: str, worker_id: str) -> bool:
+    """
+    Marks a claimed ticker as done, if the worker still holds its lease.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    ticker : str
+        The ticker symbol.
+    worker_id : str
+        Identifier of the worker that processed the ticker.
+
+    Returns
+    -------
+    bool
+        False if the lease expired and the ticker was claimed by another worker (or given up on) in the meantime.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        cursor = connection.execute(
+            """
+            UPDATE work_queue SET status = 'done', lease_expires = NULL
+            WHERE ticker = ? AND worker_id = ? AND status = 'claimed'
+            """,
+            (ticker, worker_id)
+        )
+        return cursor.rowcount == 1
+    finally:
+        connection.close()
+
+
+def release_ticker(trade_period, ticker: str, worker_id: str, max_attempts: int) -> None:
+    """
+    Gives a ticker back after its processing failed: pending again, or failed once it had max_attempts claims.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    ticker : str
+        The ticker symbol.
+    worker_id : str
+        Identifier of the worker that failed to process the ticker.
+    max_attempts : int
+        How many times a ticker may be claimed before it is given up on.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        connection.execute(
+            """
+            UPDATE work_queue
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, lease_expires = NULL
+            WHERE ticker = ? AND worker_id = ? AND status = 'claimed'
+            """,
+            (max_attempts, ticker, worker_id)
+        )
+    finally:
+        connection.close()
+
+
+def get_tickers(trade_period, statuses: List[str]) -> List[str]:
+    """
+    Gets the tickers in any of the given states.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    statuses : List[str]
+        States to select: 'pending', 'claimed', 'done' or 'failed'.
+
+    Returns
+    -------
+    List[str]
+        The tickers in those states, in queue order.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        placeholders = ', '.join('?' for _ in statuses)
+        rows = connection.execute(
+            f"SELECT ticker FROM work_queue WHERE status IN ({placeholders}) ORDER BY rowid", list(statuses)
+        ).fetchall()
+        return [row[0] for row in rows]
+    finally:
+        connection.close()
+
+
+def count_tickers(trade_period, statuses: List[str]) -> int:
+    """
+    Counts the tickers in any of the given states.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    statuses : List[str]
+        States to count: 'pending', 'claimed', 'done' or 'failed'.
+
+    Returns
+    -------
+    int
+        Number of tickers in those states.
+    """
+    connection = connect_queue(trade_period)
+    try:
+        placeholders = ', '.join('?' for _ in statuses)
+        return connection.execute(
+            f"SELECT COUNT(*) FROM work_queue WHERE status IN ({placeholders})", list(statuses)
+        ).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def count_unfinished_tickers(trade_period) -> int:
+    """
+    Counts the tickers that are still pending or claimed.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+
+    Returns
+    -------
+    int
+        Number of tickers that are neither done nor failed.
+    """
+    return count_tickers(trade_period, ['pending', 'claimed'])
+
+
+def save_shard_data(shard_data, trade_period, worker_id: str) -> None:
+    """
+    Saves one worker's ticker data to its own shard file, so workers never write the same file.
+
+    Parameters
+    ----------
+    shard_data : dict
+        Dictionary containing the data for the tickers processed by this worker.
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    worker_id : str
+        Identifier of the worker.
+    """
+    datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
+    directory = f'data/{datetime_string}/shards'
+    os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file first so the coordinator never reads a half-written shard
+    tmp_path = f'{directory}/{worker_id}.json.tmp'
+    with open(tmp_path, 'w') as outfile:
+        json.dump(shard_data, outfile, indent=4, default=str)
+    os.replace(tmp_path, f'{directory}/{worker_id}.json')
+
+
+def merge_shard_data(trade_period) -> dict:
+    """
+    Merges all shard files for a trade period into a single ticker_data dictionary.
+
+    If a ticker shows up in more than one shard (its lease expired and another worker redid it),
+    the entry with the most records is kept.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+
+    Returns
+    -------
+    dict
+        Dictionary containing the merged ticker data.
+    """
+    datetime_string = trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M')
+    directory = f'data/{datetime_string}/shards'
+    if not os.path.isdir(directory):
+        return {}
+
+    ticker_data = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        with open(f'{directory}/{filename}', 'r') as infile:
+            shard_data = json.load(infile)
+        for ticker, data in shard_data.items():
+            if ticker not in ticker_data or len(data['records']) > len(ticker_data[ticker]['records']):
+                ticker_data[ticker] = data
+    return ticker_data
@@ -0,0 +1,271 @@
+#/utils/sweep_utils.py
+import csv
+import itertools
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def load_scored_periods(data_directory: str = 'data') -> Dict[str, Any]:
+    """
+    Loads every scored period's ticker_data.json once and flattens the records into arrays.
+
+    Parameters
+    ----------
+    data_directory : str
+        Directory holding one sub directory per trade period.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Dictionary with the period, ticker and source names, one array entry per record
+        ('period', 'ticker', 'score', 'age_hours', 'source') and (period, ticker) arrays
+        with the buy and sell times and each ticker's 'position' in its period's ticker_data.
+    """
+    periods = sorted(
+        name for name in os.listdir(data_directory)
+        if os.path.exists(f'{data_directory}/{name}/ticker_data.json')
+    )
+    tickers, sources = {}, {}
+    columns = {'period': [], 'ticker': [], 'score': [], 'publish_time': [], 'buy_time': [], 'source': []}
+    trade_times = {}
+
+    for period_index, period in enumerate(periods):
+        with open(f'{data_directory}/{period}/ticker_data.json', 'r') as infile:
+            ticker_data = json.load(infile)
+        for position, (ticker, data) in enumerate(ticker_data.items()):
+            ticker_index = tickers.setdefault(ticker, len(tickers))
+            trade_times[(period_index, ticker_index)] = (data['buy_time'], data['sell_time'], position)
+            for record in data['records']:
+                source = record['headline'].get('source', 'unknown')
+                columns['period'].append(period_index)
+                columns['ticker'].append(ticker_index)
+                columns['score'].append(record['score'])
+                columns['publish_time'].append(str(record['headline']['publish_time'])[:16])
+                columns['buy_time'].append(data['buy_time'])
+                columns['source'].append(sources.setdefault(source, len(sources)))
+
+    buy_times = np.full((len(periods), len(tickers)), None, dtype=object)
+    sell_times = np.full((len(periods), len(tickers)), None, dtype=object)
+    positions = np.full((len(periods), len(tickers)), len(tickers), dtype=np.int64)
+    for (period_index, ticker_index), (buy_time, sell_time, position) in trade_times.items():
+        buy_times[period_index, ticker_index] = buy_time
+        sell_times[period_index, ticker_index] = sell_time
+        positions[period_index, ticker_index] = position
+
+    publish_time = np.array(columns['publish_time'], dtype='datetime64[m]')
+    buy_time = np.array(columns['buy_time'], dtype='datetime64[m]')
+    return {
+        'periods': periods,
+        'tickers': list(tickers),
+        'sources': list(sources),
+        'period': np.array(columns['period'], dtype=np.int64),
+        'ticker': np.array(columns['ticker'], dtype=np.int64),
+        'score': np.array(columns['score'], dtype=np.float64),
+        'age_hours': (buy_time - publish_time).astype(np.float64) / 60,
+        'source': np.array(columns['source'], dtype=np.int64),
+        'buy_times': buy_times,
+        'sell_times': sell_times,
+        'positions': positions,
+    }
+
+
+def load_prices(file_path: str) -> Dict[Tuple[str, str], float]:
+    """
+    Loads local prices from a CSV file with 'ticker', 'time' ('%Y-%m-%d %H:%M') and 'price' columns.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the CSV file.
+
+    Returns
+    -------
+    Dict[Tuple[str, str], float]
+        Price keyed by (ticker, time).
+    """
+    with open(file_path, 'r', newline='') as csvfile:
+        return {(row['ticker'], row['time']): float(row['price']) for row in csv.DictReader(csvfile)}
+
+
+def get_ticker_returns(scored: Dict[str, Any], prices: Dict[Tuple[str, str], float]) -> np.ndarray:
+    """
+    Computes the buy-to-sell return of every (period, ticker), NaN where a price is missing.
+
+    Parameters
+    ----------
+    scored : Dict[str, Any]
+        The arrays returned by load_scored_periods.
+    prices : Dict[Tuple[str, str], float]
+        The prices returned by load_prices.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (periods, tickers) with the long return of each ticker.
+    """
+    returns = np.full(scored['buy_times'].shape, np.nan)
+    for (period_index, ticker_index), buy_time in np.ndenumerate(scored['buy_times']):
+        if buy_time is None:
+            continue
+        ticker = scored['tickers'][ticker_index]
+        buy_price = prices.get((ticker, buy_time))
+        sell_price = prices.get((ticker, scored['sell_times'][period_index, ticker_index]))
+        if buy_price and sell_price is not None:
+            returns[period_index, ticker_index] = sell_price / buy_price - 1
+    return returns
+
+
+def aggregate_scores(scored: Dict[str, Any], score_method: str, excluded_sources: List[str],
+                     half_life_hours: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregates the record scores of every (period, ticker) in one pass.
+
+    Parameters
+    ----------
+    scored : Dict[str, Any]
+        The arrays returned by load_scored_periods.
+    score_method : str
+        'mean', 'sum' or 'decayed' (mean weighted by 0.5 ** (age / half_life_hours)).
+    excluded_sources : List[str]
+        Headline sources whose records are ignored.
+    half_life_hours : Optional[float]
+        Half life of a headline's weight, only used by 'decayed'.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Arrays of shape (periods, tickers) with the number of headlines and the aggregated score.
+    """
+    shape = scored['buy_times'].shape
+    excluded = [scored['sources'].index(source) for source in excluded_sources if source in scored['sources']]
+    mask = ~np.isin(scored['source'], excluded)
+    group = scored['period'][mask] * shape[1] + scored['ticker'][mask]
+    score = scored['score'][mask]
+    size = shape[0] * shape[1]
+
+    counts = np.bincount(group, minlength=size)
+    if score_method == 'decayed':
+        weights = 0.5 ** (np.maximum(scored['age_hours'][mask], 0) / half_life_hours)
+        totals = np.bincount(group, weights=score * weights, minlength=size)
+        divisors = np.bincount(group, weights=weights, minlength=size)
+    else:
+        totals = np.bincount(group, weights=score, minlength=size)
+        divisors = counts if score_method == 'mean' else np.ones(size)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = np.where(counts > 0, totals / divisors, np.nan)
+    return counts.reshape(shape), values.reshape(shape)
+
+
+def rank_tickers(counts: np.ndarray, values: np.ndarray, positions: np.ndarray, min_headlines: int,
+                 max_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ranks every period's tickers once, so any top-k up to max_k is a slice of the result.
+
+    Ties keep the order of the period's ticker_data, like the stable sort in get_best_tickers/get_worst_tickers.
+
+    Parameters
+    ----------
+    counts : np.ndarray
+        Number of headlines per (period, ticker).
+    values : np.ndarray
+        Aggregated score per (period, ticker).
+    positions : np.ndarray
+        Position of each ticker in its period's ticker_data.
+    min_headlines : int
+        Minimum number of headlines a ticker needs to be selected.
+    max_k : int
+        The largest number of tickers to select on each side.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Ticker indices of shape (periods, max_k) for the best and the worst tickers, -1 where there are too few eligible tickers.
+    """
+    eligible = counts >= min_headlines
+    ranked = []
+    for key in (np.where(eligible, -values, np.inf), np.where(eligible, values, np.inf)):
+        # lexsort sorts by the last key first, positions break the ties
+        order = np.lexsort((positions, key), axis=1)[:, :max_k]
+        ranked.append(np.where(np.take_along_axis(eligible, order, axis=1), order, -1))
+    return ranked[0], ranked[1]
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Expands a parameter grid into the list of aggregation settings it covers.
+
+    Parameters
+    ----------
+    grid : Dict[str, List[Any]]
+        Dictionary with 'score_methods', 'half_life_hours' and 'excluded_sources' lists.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        One dictionary per aggregation, half lives are only combined with 'decayed'.
+    """
+    aggregations = []
+    for score_method, excluded_sources in itertools.product(grid['score_methods'], grid['excluded_sources']):
+        half_lives = grid['half_life_hours'] if score_method == 'decayed' else [None]
+        for half_life_hours in half_lives:
+            aggregations.append({
+                'score_method': score_method,
+                'half_life_hours': half_life_hours,
+                'excluded_sources': list(excluded_sources),
+            })
+    return aggregations
+
+
+def run_sweep(scored: Dict[str, Any], grid: Dict[str, List[Any]], returns: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """
+    Evaluates every combination of the grid on the already scored periods.
+
+    Parameters
+    ----------
+    scored : Dict[str, Any]
+        The arrays returned by load_scored_periods.
+    grid : Dict[str, List[Any]]
+        Dictionary with 'top_k', 'min_headlines', 'score_methods', 'half_life_hours' and 'excluded_sources' lists.
+    returns : Optional[np.ndarray]
+        Per (period, ticker) returns from get_ticker_returns, if prices are available.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        One result per configuration with its parameters, the buy/short_sell decisions per period
+        and, if returns were given, the average return of the selected positions.
+    """
+    tickers = np.array(scored['tickers'] + [None], dtype=object)  # index -1 maps to None
+    max_k = max(grid['top_k'])
+    results = []
+
+    for aggregation in expand_grid(grid):
+        counts, values = aggregate_scores(scored, aggregation['score_method'], aggregation['excluded_sources'],
+                                          aggregation['half_life_hours'])
+        for min_headlines in grid['min_headlines']:
+            best, worst = rank_tickers(counts, values, scored['positions'], min_headlines, max_k)
+            if returns is not None:
+                padded = np.hstack([returns, np.full((returns.shape[0], 1), np.nan)])
+                best_returns = np.take_along_axis(padded, best, axis=1)
+                worst_returns = -np.take_along_axis(padded, worst, axis=1)
+
+            for top_k in grid['top_k']:
+                result = dict(aggregation, top_k=top_k, min_headlines=min_headlines)
+                result['decisions'] = {
+                    period: {
+                        'buy': [ticker for ticker in tickers[best[i, :top_k]] if ticker is not None],
+                        'short_sell': [ticker for ticker in tickers[worst[i, :top_k]] if ticker is not None],
+                    }
+                    for i, period in enumerate(scored['periods'])
+                }
+                if returns is not None:
+                    position_returns = np.hstack([best_returns[:, :top_k], worst_returns[:, :top_k]])
+                    priced = ~np.isnan(position_returns)
+                    result['num_positions'] = int(priced.sum())
+                    result['average_return'] = float(position_returns[priced].mean()) if priced.any() else None
+                results.append(result)
+    return results
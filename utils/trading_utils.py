@@ -192,6 +192,10 @@ def execute_trade(action: str, ticker: str, data: dict, trade_period: dict):
     # if data['average_score'] > 0, buy; if data['average_score'] < 0, sell; if data['average_score'] == 0, hold.
 
 
+# get_best_tickers/get_worst_tickers only select tickers with at least this many records
+MIN_SELECTION_RECORDS = 2
+
+
 def get_tickers_with_records_above_one(sorted_tickers: List[Tuple[str, dict]], num_tickers: int) -> List[Tuple[str, dict]]:
     """
     Helper function that filters the tickers based on the length of their records.
@@ -210,7 +214,7 @@ def get_tickers_with_records_above_one(sorted_tickers: List[Tuple[str, dict]], n
     """
     tickers = []
     for ticker, data in sorted_tickers:
-        if len(data['records']) > 1:
+        if len(data['records']) >= MIN_SELECTION_RECORDS:
             tickers.append((ticker, data))
             if len(tickers) == num_tickers:
                 break
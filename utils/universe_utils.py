@@ -0,0 +1,261 @@
+#/utils/universe_utils.py
+import csv
+import json
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas_market_calendars as mcal
+
+from config import (TICKERS, UNIVERSE_FILE, UNIVERSE_STATS_PATH, HOT_TIER_MIN_RATE, WARM_TIER_MIN_RATE,
+                    WARM_FETCH_EVERY, COLD_FETCH_EVERY, ACTIVITY_SMOOTHING, MIN_TIER_PERIODS)
+
+TIERS = ('hot', 'warm', 'cold')
+# Trade periods are numbered from the first session on or after this date, see get_period_number
+CALENDAR_START = '2000-01-01'
+
+
+def read_ticker_file(file_path: str) -> List[str]:
+    """
+    Reads tickers from a file with one ticker per line, or a CSV file whose first column is the ticker.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the file.
+
+    Returns
+    -------
+    List[str]
+        The tickers in file order. Blank lines, '#' comments and a 'ticker'/'symbol' header are skipped.
+    """
+    tickers = []
+    with open(file_path, 'r', newline='') as infile:
+        for row in csv.reader(infile):
+            if not row or not row[0].strip() or row[0].strip().startswith('#'):
+                continue
+            ticker = row[0].strip()
+            if ticker.lower() in ('ticker', 'symbol'):
+                continue
+            tickers.append(ticker)
+    return tickers
+
+
+# Named ticker sources, add an entry here to load the universe from somewhere else
+UNIVERSE_SOURCES: Dict[str, Callable[[], List[str]]] = {
+    'config': lambda: TICKERS,
+    'file': lambda: read_ticker_file(UNIVERSE_FILE),
+}
+
+
+def load_universe(source: Optional[Union[str, Callable[[], List[str]]]] = None) -> List[str]:
+    """
+    Loads the ticker universe and removes duplicates.
+
+    Parameters
+    ----------
+    source : Optional[Union[str, Callable[[], List[str]]]]
+        A name from UNIVERSE_SOURCES, a path to a ticker file or a function returning tickers.
+        Defaults to UNIVERSE_FILE if it is set, otherwise config.TICKERS.
+
+    Returns
+    -------
+    List[str]
+        Upper case tickers, in the order they were first listed.
+    """
+    if source is None:
+        source = 'file' if UNIVERSE_FILE else 'config'
+    if callable(source):
+        tickers = source()
+    elif source in UNIVERSE_SOURCES:
+        tickers = UNIVERSE_SOURCES[source]()
+    else:
+        tickers = read_ticker_file(source)
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers))
+
+
+def build_activity_stats(data_directory: str = 'data') -> Dict[str, Dict[str, float]]:
+    """
+    Builds per-ticker headline rates from the ticker_data.json of every past period.
+
+    Parameters
+    ----------
+    data_directory : str
+        Directory holding one sub directory per trade period.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        Dictionary mapping each ticker to its moving average 'rate' of headlines per period,
+        the number of 'periods' it has been observed in and the 'last_period' it was observed in.
+    """
+    stats = {}
+    if not os.path.isdir(data_directory):
+        return stats
+    for period in sorted(os.listdir(data_directory)):
+        file_path = f'{data_directory}/{period}/ticker_data.json'
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r') as infile:
+            ticker_data = json.load(infile)
+        update_activity_stats(stats, {ticker: get_headline_count(data) for ticker, data in ticker_data.items()}, period)
+    return stats
+
+
+def update_activity_stats(stats: Dict[str, Dict[str, float]], headline_counts: Dict[str, int], period: str) -> None:
+    """
+    Folds one period's headline counts into the per-ticker moving averages.
+
+    Parameters
+    ----------
+    stats : Dict[str, Dict[str, float]]
+        The activity stats to update in place.
+    headline_counts : Dict[str, int]
+        Number of headlines found for each ticker that was fetched this period.
+    period : str
+        The period's directory name. Tickers already counted for this period are skipped, so re-runs don't count twice.
+    """
+    for ticker, count in headline_counts.items():
+        if ticker not in stats:
+            stats[ticker] = {'rate': float(count), 'periods': 1, 'last_period': period}
+        elif stats[ticker].get('last_period') != period:
+            rate = ACTIVITY_SMOOTHING * count + (1 - ACTIVITY_SMOOTHING) * stats[ticker]['rate']
+            stats[ticker] = {'rate': rate, 'periods': stats[ticker]['periods'] + 1, 'last_period': period}
+
+
+def load_activity_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Loads the activity stats, building them from past periods if they have not been saved yet.
+
+    Returns
+    -------
+    Dict[str, Dict[str, float]]
+        The activity stats, see build_activity_stats.
+    """
+    if not os.path.exists(UNIVERSE_STATS_PATH):
+        return build_activity_stats()
+    with open(UNIVERSE_STATS_PATH, 'r') as infile:
+        return json.load(infile)
+
+
+def save_activity_stats(stats: Dict[str, Dict[str, float]]) -> None:
+    """
+    Saves the activity stats to UNIVERSE_STATS_PATH.
+
+    Parameters
+    ----------
+    stats : Dict[str, Dict[str, float]]
+        The activity stats.
+    """
+    directory = os.path.dirname(UNIVERSE_STATS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(UNIVERSE_STATS_PATH, 'w') as outfile:
+        json.dump(stats, outfile, indent=4)
+
+
+def get_tier(stats: Dict[str, Dict[str, float]], ticker: str) -> str:
+    """
+    Gets the activity tier of a ticker. Tickers observed in fewer than MIN_TIER_PERIODS periods are hot,
+    so a fresh checkout scans the whole universe until every ticker's rate has been measured.
+
+    Parameters
+    ----------
+    stats : Dict[str, Dict[str, float]]
+        The activity stats.
+    ticker : str
+        The ticker symbol.
+
+    Returns
+    -------
+    str
+        'hot', 'warm' or 'cold'.
+    """
+    if ticker not in stats or stats[ticker]['periods'] < MIN_TIER_PERIODS:
+        return 'hot'
+    rate = stats[ticker]['rate']
+    if rate >= HOT_TIER_MIN_RATE:
+        return 'hot'
+    if rate >= WARM_TIER_MIN_RATE:
+        return 'warm'
+    return 'cold'
+
+
+def get_period_number(trade_period) -> int:
+    """
+    Gets the position of a trade period in the NYSE calendar. Every session has two periods, one buying
+    at the open and one buying at the close, so half days and holidays don't shift the rotation.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+
+    Returns
+    -------
+    int
+        The number of trade periods between CALENDAR_START and this one.
+    """
+    buy_time = trade_period['trade_buy_time']
+    schedule = mcal.get_calendar('NYSE').schedule(start_date=CALENDAR_START, end_date=buy_time.date())
+    return (len(schedule) - 1) * 2 + (buy_time >= schedule['market_close'].iloc[-1])
+
+
+def get_scheduled_tickers(trade_period, tickers: Optional[List[str]] = None) -> List[str]:
+    """
+    Picks the tickers to fetch this period: every hot ticker, and a rotating share of the warm and cold ones.
+
+    Each warm/cold ticker is fetched every WARM_FETCH_EVERY/COLD_FETCH_EVERY periods, offset by a
+    hash of the ticker so the load is spread evenly over the periods.
+
+    Parameters
+    ----------
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    tickers : Optional[List[str]]
+        The ticker universe. Defaults to load_universe().
+
+    Returns
+    -------
+    List[str]
+        The tickers to fetch, hot tickers first and busiest first within each tier.
+    """
+    if tickers is None:
+        tickers = load_universe()
+    stats = load_activity_stats()
+    period_number = get_period_number(trade_period)
+    fetch_every = {'hot': 1, 'warm': WARM_FETCH_EVERY, 'cold': COLD_FETCH_EVERY}
+
+    scheduled = []
+    for ticker in tickers:
+        tier = get_tier(stats, ticker)
+        if (period_number + zlib.crc32(ticker.encode())) % fetch_every[tier] == 0:
+            scheduled.append((TIERS.index(tier), -stats.get(ticker, {}).get('rate', 0.0), ticker))
+    return [ticker for _, _, ticker in sorted(scheduled)]
+
+
+def get_headline_count(data: dict) -> int:
+    # Headlines found for the ticker, the scored records are a fallback for data saved before total_headlines existed
+    return data.get('total_headlines', len(data['records']))
+
+
+def record_ticker_activity(scheduled_tickers: List[str], ticker_data: dict, trade_period) -> None:
+    """
+    Updates and saves the activity stats with the headline counts of this period's fetched tickers.
+
+    Parameters
+    ----------
+    scheduled_tickers : List[str]
+        The tickers whose headlines were fetched this period. Tickers missing from ticker_data count as having
+        no headlines, so tickers whose fetch failed must be left out.
+    ticker_data : dict
+        Dictionary containing the data for the processed tickers.
+    trade_period : dict
+        Dictionary containing the current trade period's details.
+    """
+    stats = load_activity_stats()
+    update_activity_stats(stats, {
+        ticker: get_headline_count(ticker_data[ticker]) if ticker in ticker_data else 0
+        for ticker in scheduled_tickers
+    }, trade_period['trade_buy_time'].strftime('%Y%m%d_%H%M'))
+    save_activity_stats(stats)